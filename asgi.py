@@ -0,0 +1,560 @@
+# asgi.py # app.py와 같은 위치
+# 비동기 실행 모드 : Flask(app.py)와 같은 route, 같은 JSON 응답을 AsyncElasticsearch 로 처리
+# app.py 와 다른 점(비동기 모드에서 지원하지 않는 기능) :
+# - Stored search template 을 사용하지 않고 Query DSL 을 전송(검색 결과 캐시 key 도 Query DSL 기준)
+# - 지표(search_metrics : 응답시간, Elasticsearch 처리시간, 캐시 hit/miss), 느린 조회 로그(slow_query_log)를 기록하지 않음
+# - 요청 기록(traffic_capture)을 하지 않음
+# - /metrics, /stats/*, /cache, /export, /kafka_api route 없음
+# 실행 명령어 :
+# gunicorn asgi:app -k uvicorn.workers.UvicornWorker -w 4 --bind unix:/run/uwsgi-test/search_restapi.sock
+import asyncio
+from starlette.applications import Starlette
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.responses import Response, HTMLResponse
+from starlette.routing import Route
+from elasticsearch import AsyncElasticsearch
+from app import (
+    make_search_client_options, search_cache, search_cache_ttl, parse_cursor_args, get_curr_from,
+    make_search_condition, make_keyword_query, make_text_query, make_scroll_query,
+    make_search_result_scroll, make_search_result_page, make_error_message, make_search_sql,
+    make_sql_body, make_sql_result, make_paging, get_page_args, get_index,
+    make_batch_queries, make_batch_result, elasticsearch_sql_endpoint, batch_max_queries,
+    batch_max_concurrent_searches, scroll_registry, es_logger, encode_json, get_hits,
+    search_filter_path, cursor_filter_path, batch_filter_path, suggest_cache, suggest_index, suggest_size,
+    suggest_max_prefix_length, suggest_filter_path, make_suggest_query, get_suggestions, fetch_suggestions,
+    parse_facet_names, apply_facets, make_facet_result, facet_filter_path, compress_min_size, compress_level,
+    warmup_enabled, warmup_connections, warmup_queries, query_builders, count_default, parse_count_mode,
+    make_total_count, make_count_key, get_reused_count, save_count
+)
+from search_cursor import apply_point_in_time, make_next_cursor, cursor_keep_alive
+from singleflight import AsyncSingleFlight
+from suggest_cache import normalize_prefix
+from warmup import startup_timer
+from slow_query import condense_profile
+from response_encoding import choose_encoding, is_compressible, make_etag, etag_matches, compress_body
+
+# worker 프로세스 별 AsyncElasticsearch client(startup 에서 생성)
+async_search = None
+# 동시에 들어온 같은 조건의 검색은 1번만 조회
+async_single_flight = AsyncSingleFlight()
+
+# flask_restful 의 HTTP 오류 메시지와 동일하게 응답
+http_error_messages = {
+    400: "The browser (or proxy) sent a request that this server could not understand.",
+    404: "The requested URL was not found on the server. "
+         "If you entered the URL manually please check your spelling and try again.",
+    405: "The method is not allowed for the requested URL.",
+    500: "The server encountered an internal error and was unable to complete your request. "
+         "Either the server is overloaded or there is an error in the application."
+}
+
+
+# app.py 의 output_json 과 같은 형식의 JSON 응답
+class RestfulJSONResponse(Response):
+    media_type = 'application/json'
+
+    def render(self, content):
+        return encode_json(content)
+
+
+# app.py 의 encode_response 와 같은 응답 후처리 : GET 응답 ETag/304, 기준 크기 이상 응답 압축
+# body 를 1번에 전송하는 응답만 처리하고 나눠서 전송하는 응답은 그대로 전달
+class ResponseEncodingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get('accept-encoding'))
+        start_message = None
+
+        async def send_encoded(message):
+            nonlocal start_message
+            if message['type'] == 'http.response.start':
+                start_message = dict(message, headers=list(message.get('headers', [])))
+                return
+            if message['type'] != 'http.response.body' or start_message is None:
+                await send(message)
+                return
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=start['headers'])
+            body = message.get('body', b'')
+            if start['status'] != 200 or message.get('more_body') or 'content-encoding' in headers \
+                    or not is_compressible(headers.get('content-type')):
+                await send(start)
+                await send(message)
+                return
+            headers.add_vary_header('Accept-Encoding')
+            body_encoding = encoding if len(body) >= compress_min_size else None
+            if scope['method'] == 'GET':
+                etag = make_etag(body, body_encoding)
+                headers['ETag'] = '"%s"' % etag
+                if etag_matches(request_headers.get('if-none-match'), etag):
+                    del headers['content-length']
+                    del headers['content-type']
+                    await send(dict(start, status=304))
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+            if body_encoding is not None:
+                body = compress_body(body, body_encoding, compress_level)
+                headers['Content-Encoding'] = body_encoding
+                headers['Content-Length'] = str(len(body))
+            await send(start)
+            await send(dict(message, body=body))
+
+        await self.app(scope, receive, send_encoded)
+
+
+# worker 시작 시 AsyncElasticsearch client 생성
+async def create_async_search_client():
+    global async_search
+    hosts, options = make_search_client_options()
+    async_search = AsyncElasticsearch(hosts, **options)
+
+
+# Node 별로 connection 을 count 개씩 미리 연결(app.open_search_connections 의 비동기 버전)
+# transport 를 거치지 않고 Node 별 connection 에 직접 요청하여 모든 Node 에 같은 수로 연결
+async def open_search_connections(count):
+    transport = async_search.transport
+    # AsyncTransport 는 첫 요청 시 event loop 에서 connection 생성
+    await transport._async_call()
+    connection_pool = transport.connection_pool
+    connections = getattr(connection_pool, 'orig_connections', connection_pool.connections)
+    results = await asyncio.gather(*[conn.perform_request('HEAD', '/') for conn in connections for _ in range(count)],
+                                   return_exceptions=True)
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        raise errors[0]
+
+
+# worker warm-up(app.warm_up_worker 의 비동기 버전) : connection 미리 연결, 자주 사용하는 검색 미리 조회
+# 비동기 모드는 search template 을 사용하지 않으므로 요청과 같은 Query DSL 로 미리 조회
+async def warm_up_async_worker():
+    if not warmup_enabled:
+        return
+    startup_timer.begin()
+    with startup_timer.stage('connections', es_logger):
+        await open_search_connections(warmup_connections)
+    with startup_timer.stage('top_queries', es_logger):
+        for item in warmup_queries:
+            # 요청과 같은 캐시 key 가 되도록 search_page 로 조회
+            body_obj = query_builders[item['type']](0, item['keyword'], dict(item.get('args', {})))
+            await search_page(item['route'], 'search-nori-sample1', body_obj, 1, 0, False, None)
+    startup_timer.log(es_logger)
+
+
+# worker 종료 시 connection 정리
+async def close_async_search_client():
+    if async_search is not None:
+        await async_search.close()
+
+
+# json body 조회(flask 와 같이 잘못된 json 은 400 으로 응답)
+async def read_json_body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400)
+
+
+# 요청 파라메터 조회(reqparse 와 같이 query string, form, json 을 사용)
+async def get_request_args(request):
+    args = dict(request.query_params)
+    if request.method in ('POST', 'DELETE'):
+        content_type = request.headers.get('content-type', '')
+        if content_type.startswith('application/json'):
+            body = await read_json_body(request)
+            if isinstance(body, dict):
+                args.update(body)
+        else:
+            form = await request.form()
+            args.update(form)
+    return args
+
+
+# 캐시, 요청 병합을 사용한 Elasticsearch 조회(app.execute_search 의 비동기 버전)
+async def execute_search(route, index, body, filter_path=None):
+    ttl = search_cache_ttl.get(route)
+    key = search_cache.make_key(index, body)
+    if ttl:
+        res = search_cache.get(index, key)
+        if res is not None:
+            return res
+
+    async def call_search():
+        search_res = await async_search.search(index=index, body=body, filter_path=filter_path or search_filter_path)
+        if ttl:
+            search_cache.set(index, key, search_res, ttl)
+        return search_res
+
+    return await async_single_flight.do(key, call_search)
+
+
+# 커서 방식 조회(app.search_with_cursor 의 비동기 버전)
+async def search_with_cursor(index, body, cursor_state, page, row_per_page, reused=None):
+    if reused is not None:
+        body['track_total_hits'] = False
+    if cursor_state is None:
+        pit = await async_search.open_point_in_time(index=index, keep_alive=cursor_keep_alive)
+        pit_id = pit['id']
+        search_after = None
+    else:
+        pit_id = cursor_state['pit']
+        search_after = cursor_state['after']
+    body = apply_point_in_time(body, pit_id, search_after)
+    res = await async_search.search(body=body, filter_path=cursor_filter_path)
+    if reused is not None:
+        total = reused['total']
+    else:
+        total = make_total_count(res.get('hits', {}).get('total'))
+    cursor = make_next_cursor(res, page, row_per_page, total)
+    if cursor is None:
+        await async_search.close_point_in_time(body={"id": res.get('pit_id', pit_id)}, ignore=404)
+    return res, cursor
+
+
+# Profile API 를 사용한 조회(app.profile_search 의 비동기 버전, 캐시, 요청 병합을 사용하지 않음)
+async def profile_search(index, body):
+    body['profile'] = True
+    return await async_search.search(index=index, body=body, filter_path=search_filter_path + ['profile'])
+
+
+# 페이지 번호 방식 조회 결과 반환(app.search_page 의 비동기 버전)
+async def search_page(route, index, body_obj, page, from_num, cursor_mode, cursor_state, facet_names=None,
+                      track_total_hits=count_default, profile=False):
+    if cursor_mode:
+        body_obj['track_total_hits'] = track_total_hits
+        reused = get_reused_count(index, None, page, cursor_state)
+        res, cursor = await search_with_cursor(index, body_obj, cursor_state, page, body_obj['size'], reused)
+        result = make_search_result_page(res, page, from_num, reused)
+        result['cursor'] = cursor
+        return result
+    if profile:
+        body_obj['track_total_hits'] = track_total_hits
+        res = await profile_search(index, body_obj)
+        result = make_search_result_page(res, page, from_num)
+        result['profile'] = condense_profile(res.get('profile'))
+        return result
+    filter_path = None
+    if facet_names:
+        body_obj = apply_facets(body_obj, facet_names)
+        filter_path = facet_filter_path
+    count_key = make_count_key(index, body_obj, track_total_hits) if track_total_hits is not False else None
+    reused = get_reused_count(index, count_key, page)
+    body_obj['track_total_hits'] = False if reused is not None else track_total_hits
+    res = await execute_search(route, index, body_obj, filter_path=filter_path)
+    result = make_search_result_page(res, page, from_num, reused)
+    if reused is None and count_key is not None:
+        save_count(index, count_key, result)
+    if facet_names:
+        result['facets'] = make_facet_result(res, facet_names)
+    return result
+
+
+# Home
+async def hello_world(request):
+    return HTMLResponse('Elasticsearch API Home!!!!')
+
+
+# scroll 요청 클라이언트 구분(nginx 에서 전달한 X-Client-Id 또는 접속 IP)
+def get_scroll_client_id(request):
+    return request.headers.get('X-Client-Id') or (request.client.host if request.client else None)
+
+
+# 정리 대상 scroll 삭제
+async def clear_scrolls(scroll_ids):
+    if not scroll_ids:
+        return
+    try:
+        await async_search.clear_scroll(body={"scroll_id": scroll_ids}, ignore=404)
+    except Exception as err:
+        es_logger.warning("clear_scroll failed : %s", err)
+
+
+# scroll 첫 페이지 조회 후 발급된 scroll_id 등록, 결과가 없으면 바로 정리
+async def open_scroll(request, body_obj):
+    if scroll_registry.is_full():
+        return RestfulJSONResponse(make_error_message(3), status_code=429)
+    res = await async_search.search(
+        index='search-nori-sample1',
+        body=body_obj,
+        scroll='1m',
+        size=20,
+        filter_path=search_filter_path
+    )
+    if '_scroll_id' in res:
+        scroll_id = res['_scroll_id']
+        if get_hits(res):
+            await clear_scrolls(scroll_registry.register(get_scroll_client_id(request), scroll_id))
+        else:
+            scroll_registry.release(scroll_id, 'empty')
+            await clear_scrolls([scroll_id])
+    return RestfulJSONResponse(make_search_result_scroll(res))
+
+
+# scroll_id 값으로 다음 페이지 조회, 마지막 페이지(결과 없음)이면 scroll 정리
+async def next_scroll(request, args):
+    if not args.get('scroll_id'):
+        return make_error_message(1)
+    scroll_id = args['scroll_id']
+    res = await async_search.scroll(scroll_id=scroll_id, scroll='1m', filter_path=search_filter_path)
+    next_scroll_id = res.get('_scroll_id', scroll_id)
+    if get_hits(res):
+        scroll_registry.touch(get_scroll_client_id(request), scroll_id, next_scroll_id)
+    else:
+        scroll_registry.release(scroll_id, 'empty')
+        scroll_registry.release(next_scroll_id, 'empty')
+        await clear_scrolls(list({scroll_id, next_scroll_id}))
+    return make_search_result_scroll(res)
+
+
+# scroll_id 값으로 scroll 정리
+async def delete_scroll(args):
+    if not args.get('scroll_id'):
+        return make_error_message(1)
+    scroll_registry.release(args['scroll_id'])
+    await clear_scrolls([args['scroll_id']])
+    return {
+        "succeeded": True
+    }
+
+
+# scroll 방식 조회
+async def scroll_search(make_query, request):
+    keyword_p = request.path_params['keyword_p']
+    args = await get_request_args(request)
+    if request.method == 'POST':
+        return RestfulJSONResponse(await next_scroll(request, args))
+    if request.method == 'DELETE':
+        return RestfulJSONResponse(await delete_scroll(args))
+    body_obj = make_scroll_query(make_query(0, keyword_p, args))
+    return await open_scroll(request, body_obj)
+
+
+# scroll 정리 API
+async def scroll_clear(request):
+    args = await get_request_args(request)
+    return RestfulJSONResponse(await delete_scroll(args))
+
+
+# 단어 검색 샘플 API - 페이징 처리 시 scroll 사용
+async def keyword_search(request):
+    return await scroll_search(make_keyword_query, request)
+
+
+# 문장 검색 샘플 API - 페이징 처리 시 scroll 사용
+async def text_search(request):
+    return await scroll_search(make_text_query, request)
+
+
+# 페이지 번호 방식 조회
+async def paging_search(route, make_query, request):
+    page = request.path_params['page']
+    keyword_p = request.path_params['keyword_p']
+    args = await get_request_args(request)
+    cursor_mode, cursor_state = parse_cursor_args(args)
+    if cursor_mode is None:
+        return RestfulJSONResponse(make_error_message(2))
+    track_total_hits = parse_count_mode(args.get('count'))
+    if track_total_hits is None:
+        return RestfulJSONResponse(make_error_message(4))
+    if cursor_state is not None:
+        page = cursor_state['page']
+    from_num = get_curr_from(page)
+    body_obj = make_query(from_num, keyword_p, args)
+    result = await search_page(route, 'search-nori-sample1', body_obj, page, from_num, cursor_mode, cursor_state,
+                               parse_facet_names(args.get('facets')), track_total_hits,
+                               args.get('profile') == 'true')
+    return RestfulJSONResponse(result)
+
+
+# 단어 검색 샘플 API - 페이징 처리 시 from, size 사용
+async def keyword_search_paging(request):
+    if request.method == 'POST':
+        return await paging_search('keyword_paging', make_search_condition, request)
+    return await paging_search('keyword_paging', make_keyword_query, request)
+
+
+# 문장 검색 샘플 API - 페이징 처리 시 from, size 사용
+async def text_search_paging(request):
+    return await paging_search('text_paging', make_text_query, request)
+
+
+# Elasticsearch SQL 조회 - 페이징 처리 시 SQL cursor 사용
+async def sql_search(request):
+    code = request.path_params['code']
+    args = await get_request_args(request)
+    if args.get('cursor') and args.get('close') == 'true':
+        res = await async_search.transport.perform_request(
+            'POST',
+            elasticsearch_sql_endpoint + '/close',
+            body={"cursor": args['cursor']}
+        )
+        return RestfulJSONResponse({
+            "succeeded": res.get('succeeded', False)
+        })
+    res = await async_search.transport.perform_request(
+        'POST',
+        elasticsearch_sql_endpoint,
+        params={"format": "json"},
+        body=make_sql_body(code, args)
+    )
+    return RestfulJSONResponse(make_sql_result(res))
+
+
+# Elasticsearch SQL 을 사용한 조회 테스트 : SQL -> Query DSL 변환도 비동기로 호출
+async def requests_call_test(request):
+    code = request.path_params['code']
+    args = await get_request_args(request)
+    cursor_mode, cursor_state = parse_cursor_args(args)
+    if cursor_mode is None:
+        return RestfulJSONResponse(make_error_message(2))
+    sql_param = make_search_sql(code, args)
+    query_dsl = await async_search.transport.perform_request(
+        'POST',
+        elasticsearch_sql_endpoint + '/translate',
+        body={"query": sql_param}
+    )
+    page, row_per_page = get_page_args(args)
+    if cursor_state is not None:
+        page = cursor_state['page']
+        row_per_page = cursor_state['size']
+    from_num = get_curr_from(page, row_per_page)
+    search_query = make_paging(query_dsl, from_num, row_per_page)
+    if cursor_mode:
+        reused = get_reused_count(get_index(code), None, page, cursor_state)
+        res, cursor = await search_with_cursor(get_index(code), search_query, cursor_state, page, row_per_page,
+                                               reused)
+        result = make_search_result_page(res, page, from_num, reused)
+        result['cursor'] = cursor
+        return RestfulJSONResponse(result)
+    # Profile API 요청 시 shard 별 처리시간 요약 추가
+    if args.get('profile') == 'true':
+        res = await profile_search(get_index(code), search_query)
+        result = make_search_result_page(res, page, from_num)
+        result['profile'] = condense_profile(res.get('profile'))
+        return RestfulJSONResponse(result)
+    res = await async_search.search(index=get_index(code), body=search_query, filter_path=search_filter_path)
+    return RestfulJSONResponse(make_search_result_page(res, page, from_num))
+
+
+# 일괄 검색 API - 여러 검색을 1번의 _msearch 로 조회
+async def batch_search(request):
+    body = await read_json_body(request)
+    queries = body.get('queries') if isinstance(body, dict) else None
+    if not queries or not isinstance(queries, list):
+        return RestfulJSONResponse(make_error_message(1))
+    if len(queries) > batch_max_queries:
+        return RestfulJSONResponse({
+            "error": "Too many queries. (max : %d)" % batch_max_queries
+        }, status_code=400)
+    items, search_body = make_batch_queries(queries)
+    responses = []
+    if search_body:
+        res = await async_search.msearch(
+            body=search_body,
+            max_concurrent_searches=batch_max_concurrent_searches,
+            filter_path=batch_filter_path
+        )
+        responses = res['responses']
+    return RestfulJSONResponse(make_batch_result(items, responses))
+
+
+# 검색 결과 집계 API(app.FacetSearch 의 비동기 버전)
+async def facet_search(request):
+    keyword_p = request.path_params.get('keyword_p')
+    args = await get_request_args(request)
+    facet_names = parse_facet_names(args.get('facets') or 'all')
+    if not facet_names:
+        return RestfulJSONResponse(make_error_message(1))
+    if keyword_p is None:
+        body_obj = make_search_condition(0, None, args)
+    elif args.get('type') == 'text':
+        body_obj = make_text_query(0, keyword_p, args)
+    else:
+        body_obj = make_keyword_query(0, keyword_p, args)
+    body_obj['size'] = 0
+    body_obj['sort'] = []
+    body_obj['_source'] = False
+    unfiltered = keyword_p is None and not body_obj['query']['bool']['filter']['bool']['must']
+    res = await execute_search(
+        'facets_all' if unfiltered else 'facets',
+        'search-nori-sample1',
+        apply_facets(body_obj, facet_names),
+        filter_path=facet_filter_path
+    )
+    return RestfulJSONResponse({
+        "total_count": make_total_count(res.get('hits', {}).get('total')),
+        "facets": make_facet_result(res, facet_names)
+    })
+
+
+# 자동완성 API(app.Suggest 의 비동기 버전)
+# 캐시 refresh thread 는 app.py 와 같이 동기 client 로 조회하여 event loop 를 사용하지 않음
+async def suggest(request):
+    prefix = normalize_prefix(request.path_params['prefix'])[:suggest_max_prefix_length]
+    if not prefix:
+        return RestfulJSONResponse(make_error_message(1))
+    try:
+        size = max(min(int(request.query_params.get('size') or suggest_size), suggest_size), 1)
+    except ValueError:
+        size = suggest_size
+    suggest_cache.start(fetch_suggestions)
+    suggestions = suggest_cache.get(prefix)
+    if suggestions is None:
+        async def load_suggestions():
+            res = await async_search.search(
+                index=suggest_index,
+                body=make_suggest_query(prefix),
+                filter_path=suggest_filter_path
+            )
+            result = get_suggestions(res)
+            suggest_cache.put(prefix, result)
+            return result
+
+        suggestions = await async_single_flight.do('suggest:%s' % prefix, load_suggestions)
+    return RestfulJSONResponse({
+        "prefix": prefix,
+        "suggestions": suggestions[:size]
+    })
+
+
+# HTTP 오류 응답
+async def http_error(request, exc):
+    message = http_error_messages.get(exc.status_code, exc.detail)
+    return RestfulJSONResponse({"message": message}, status_code=exc.status_code)
+
+
+# 처리되지 않은 오류 응답
+async def server_error(request, exc):
+    return RestfulJSONResponse({"message": http_error_messages[500]}, status_code=500)
+
+
+app = Starlette(
+    routes=[
+        Route('/', hello_world),
+        Route('/keyword/{keyword_p}', keyword_search, methods=['GET', 'POST', 'DELETE']),
+        Route('/text/{keyword_p}', text_search, methods=['GET', 'POST', 'DELETE']),
+        Route('/scroll', scroll_clear, methods=['DELETE']),
+        Route('/keyword/{page:int}/{keyword_p}', keyword_search_paging, methods=['GET', 'POST']),
+        Route('/text/{page:int}/{keyword_p}', text_search_paging, methods=['GET']),
+        Route('/search/{code:int}', requests_call_test, methods=['POST']),
+        Route('/sql/{code:int}', sql_search, methods=['POST']),
+        Route('/batch', batch_search, methods=['POST']),
+        Route('/facets', facet_search, methods=['GET']),
+        Route('/facets/{keyword_p}', facet_search, methods=['GET']),
+        Route('/suggest/{prefix}', suggest, methods=['GET'])
+    ],
+    middleware=[Middleware(ResponseEncodingMiddleware)],
+    exception_handlers={
+        HTTPException: http_error,
+        Exception: server_error
+    },
+    on_startup=[create_async_search_client, warm_up_async_worker],
+    on_shutdown=[close_async_search_client]
+)
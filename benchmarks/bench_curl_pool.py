@@ -0,0 +1,134 @@
+# pycurl 호출 방식 비교 벤치마크
+# 기존 방식(요청마다 pycurl.Curl 생성 후 close : 매번 TCP 연결, TLS handshake)과
+# CurlPool(handle 재사용, keep-alive, CurlShare 로 DNS/SSL session 공유)의 처리량, 응답시간, 새 연결 수를 비교
+# 대체 Elasticsearch(fake_elasticsearch.py)를 같은 프로세스에서 실행하며 --tls 사용 시 임시 인증서로 https 실행(openssl 필요)
+# 실행 명령어 :
+# python benchmarks/bench_curl_pool.py --requests 1000 --threads 1 4 --tls
+from io import BytesIO
+import argparse
+import json
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pycurl  # noqa: E402
+from curl_pool import CurlPool  # noqa: E402
+from fake_elasticsearch import start_fake_elasticsearch  # noqa: E402
+
+# SQL 변환 요청 body
+translate_body = json.dumps({"query": 'SELECT * FROM "bigginsight" WHERE 1 = 1 ORDER BY accessPointId asc'})
+translate_headers = ['Content-type:application/json;charset=utf-8']
+
+
+# 기존 방식 : 요청마다 handle 생성, 연결 후 close
+def call_new_handle(url):
+    result = BytesIO()
+    conn = pycurl.Curl()
+    try:
+        conn.setopt(pycurl.URL, url)
+        conn.setopt(pycurl.POST, True)
+        conn.setopt(pycurl.SSL_VERIFYPEER, False)
+        conn.setopt(pycurl.HTTPHEADER, translate_headers)
+        conn.setopt(pycurl.POSTFIELDS, translate_body)
+        conn.setopt(pycurl.WRITEFUNCTION, result.write)
+        conn.perform()
+        return result.getvalue().decode('UTF-8')
+    finally:
+        result.close()
+        conn.close()
+
+
+# 임시 자체 서명 인증서 생성
+def make_ssl_context(work_dir):
+    cert_file = os.path.join(work_dir, 'cert.pem')
+    key_file = os.path.join(work_dir, 'key.pem')
+    subprocess.check_call([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+        '-keyout', key_file, '-out', cert_file, '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1'
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_file, key_file)
+    return context
+
+
+# thread 수 만큼 나눠서 요청 후 응답시간 목록, 전체 처리시간 반환
+def run(call, total, threads):
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        local = []
+        for _ in counter:
+            start = time.perf_counter()
+            call()
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for item in workers:
+        item.start()
+    for item in workers:
+        item.join()
+    return sorted(latencies), time.perf_counter() - start
+
+
+# 결과 요약
+def summarize(name, threads, latencies, elapsed, new_connections):
+    count = len(latencies)
+    return {
+        "mode": name,
+        "threads": threads,
+        "requests": count,
+        "throughput_rps": round(count / elapsed, 1),
+        "mean_ms": round(sum(latencies) / count * 1000, 3),
+        "p50_ms": round(latencies[count // 2] * 1000, 3),
+        "p99_ms": round(latencies[min(int(count * 0.99), count - 1)] * 1000, 3),
+        "new_connections": new_connections
+    }
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="pycurl handle pool benchmark")
+    arg_parser.add_argument('--requests', type=int, default=500)
+    arg_parser.add_argument('--threads', nargs='+', type=int, default=[1, 4])
+    arg_parser.add_argument('--latency-ms', type=float, default=0.0, help="fake elasticsearch latency")
+    arg_parser.add_argument('--tls', action='store_true', help="https with a temporary self-signed certificate")
+    options = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ssl_context = make_ssl_context(temp_dir) if options.tls else None
+        server, _ = start_fake_elasticsearch(latency_ms=options.latency_ms, ssl_context=ssl_context)
+        translate_url = "%s://127.0.0.1:%d/_xpack/sql/translate" % (
+            'https' if options.tls else 'http', server.server_address[1])
+        results = []
+        for thread_count in options.threads:
+            # 기존 방식은 요청마다 새 연결
+            run(lambda: call_new_handle(translate_url), 10, thread_count)
+            latency_list, total_time = run(lambda: call_new_handle(translate_url), options.requests, thread_count)
+            results.append(summarize("new_handle", thread_count, latency_list, total_time, options.requests))
+            pool = CurlPool(max_handles=thread_count)
+
+            def call_pool():
+                return pool.request('POST', translate_url, body=translate_body, headers=translate_headers)
+
+            latency_list, total_time = run(call_pool, options.requests, thread_count)
+            results.append(summarize(
+                "curl_pool", thread_count, latency_list, total_time, pool.stats()['new_connections']))
+            pool.close()
+        server.shutdown()
+
+    print("%-10s %7s %10s %10s %10s %10s %9s" % ("mode", "threads", "rps", "mean(ms)", "p50(ms)", "p99(ms)", "connects"))
+    for row in results:
+        print("%-10s %7d %10.1f %10.3f %10.3f %10.3f %9d" % (
+            row['mode'], row['threads'], row['throughput_rps'], row['mean_ms'], row['p50_ms'], row['p99_ms'],
+            row['new_connections']
+        ))
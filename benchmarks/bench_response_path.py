@@ -0,0 +1,141 @@
+# 검색 응답 처리 방식 비교 벤치마크
+# 기존 방식(전체 응답 수신, 행 단위 복사, 표준 json 변환)과
+# 현재 방식(filter_path 적용 응답 수신, make_search_result_page, encode_json)의
+# Elasticsearch 응답 크기, API 응답 크기, 처리 시간을 비교
+# 실행 명령어 :
+# python benchmarks/bench_response_path.py --hits 20 100 500 --repeat 200
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import make_search_result_page, encode_json, orjson  # noqa: E402
+
+
+# 테스트용 검색 결과 문서
+def make_document(num):
+    return {
+        "group_nm": "생활용품",
+        "goodsname_nm": "테스트 상품명 %d 무선 블루투스 이어폰" % num,
+        "goods_id": "G%08d" % num,
+        "cate1_code": "C%03d" % (num % 20),
+        "cate2_code": "C%05d" % (num % 200),
+        "content": "상품 상세 설명 " * 10,
+        "description": "상품 요약 설명입니다. 배송비 무료.",
+        "best_yn": "Y" if num % 3 == 0 else "N",
+        "new_yn": "Y" if num % 5 == 0 else "N",
+        "user_id": "user%04d" % (num % 1000),
+        "reg_date": "2020-01-%02dT10:00:00" % (num % 28 + 1)
+    }
+
+
+# Elasticsearch 전체 응답
+def make_full_response(hits):
+    return {
+        "took": 12,
+        "timed_out": False,
+        "_shards": {"total": 5, "successful": 5, "skipped": 0, "failed": 0},
+        "hits": {
+            "total": 123456,
+            "max_score": 7.5,
+            "hits": [
+                {
+                    "_index": "search-nori-sample1",
+                    "_type": "_doc",
+                    "_id": str(num),
+                    "_score": 7.5 - num * 0.001,
+                    "_source": make_document(num)
+                } for num in range(hits)
+            ]
+        }
+    }
+
+
+# filter_path(hits.total, hits.hits._source) 적용 응답
+def make_filtered_response(full):
+    return {
+        "hits": {
+            "total": full['hits']['total'],
+            "hits": [{"_source": row['_source']} for row in full['hits']['hits']]
+        }
+    }
+
+
+# 기존 결과 생성 방식(행 단위 append)
+def make_search_result_page_legacy(response, page, from_num):
+    total_count = response['hits']['total']
+    res_list = response['hits']['hits']
+    num_result = len(res_list)
+    data_list = []
+    for row in res_list:
+        data_list.append(row['_source'])
+    return {
+        "total_count": total_count,
+        "num_result": num_result,
+        "curr_page": page,
+        "from_num": from_num,
+        "datas": data_list
+    }
+
+
+# 기존 JSON 변환(flask_restful 기본 output_json)
+def encode_json_legacy(data):
+    return (json.dumps(data) + "\n").encode('utf-8')
+
+
+# 처리 시간 측정(마이크로초)
+def measure(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000000
+
+
+def run(hits, repeat):
+    full = make_full_response(hits)
+    full_bytes = json.dumps(full).encode('utf-8')
+    filtered_bytes = json.dumps(make_filtered_response(full)).encode('utf-8')
+    legacy_result = make_search_result_page_legacy(json.loads(full_bytes), 1, 0)
+    current_result = make_search_result_page(json.loads(filtered_bytes), 1, 0)
+    return {
+        "hits": hits,
+        "es_bytes_legacy": len(full_bytes),
+        "es_bytes_current": len(filtered_bytes),
+        "api_bytes_legacy": len(encode_json_legacy(legacy_result)),
+        "api_bytes_current": len(encode_json(current_result)),
+        "decode_us_legacy": measure(lambda: json.loads(full_bytes), repeat),
+        "decode_us_current": measure(lambda: json.loads(filtered_bytes), repeat),
+        "shape_us_legacy": measure(lambda: make_search_result_page_legacy(json.loads(full_bytes), 1, 0), repeat)
+        - measure(lambda: json.loads(full_bytes), repeat),
+        "shape_us_current": measure(lambda: make_search_result_page(json.loads(filtered_bytes), 1, 0), repeat)
+        - measure(lambda: json.loads(filtered_bytes), repeat),
+        "encode_us_legacy": measure(lambda: encode_json_legacy(legacy_result), repeat),
+        "encode_us_current": measure(lambda: encode_json(current_result), repeat)
+    }
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="search response path benchmark")
+    arg_parser.add_argument('--hits', type=int, nargs='+', default=[20, 100, 500])
+    arg_parser.add_argument('--repeat', type=int, default=200)
+    arg_parser.add_argument('--json', action='store_true', help="결과를 JSON 으로 출력")
+    options = arg_parser.parse_args()
+    results = [run(hits, options.repeat) for hits in options.hits]
+    if options.json:
+        print(json.dumps({"orjson": orjson is not None, "results": results}, indent=2))
+    else:
+        print("orjson : %s" % ("used" if orjson is not None else "not installed"))
+        print("%6s %12s %12s %12s %12s %12s %12s %12s %12s" % (
+            "hits", "es_bytes", "es_bytes'", "api_bytes", "api_bytes'",
+            "decode_us", "decode_us'", "encode_us", "encode_us'"))
+        for result in results:
+            print("%6d %12d %12d %12d %12d %12.1f %12.1f %12.1f %12.1f" % (
+                result['hits'],
+                result['es_bytes_legacy'], result['es_bytes_current'],
+                result['api_bytes_legacy'], result['api_bytes_current'],
+                result['decode_us_legacy'], result['decode_us_current'],
+                result['encode_us_legacy'], result['encode_us_current']))
+        print("(' : filter_path + encode_json)")
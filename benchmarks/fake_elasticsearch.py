@@ -0,0 +1,366 @@
+# 벤치마크용 Elasticsearch 대체 서버
+# _search, _search/scroll, _search/template, _render/template, _msearch, _sql, _sql/translate, point in time, _scripts 요청에
+# 미리 정의한 응답을 지연시간(latency)을 적용하여 반환
+# 단독 실행 명령어 :
+# python benchmarks/fake_elasticsearch.py --port 9200 --latency-ms 5
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+
+
+class FakeElasticsearchState:
+    """
+    대체 서버 설정 및 scroll, SQL cursor 상태
+    """
+    def __init__(self, latency_ms=5.0, jitter_ms=0.0, total_hits=1000, scroll_pages=3, count_latency_ms=0.0):
+        """
+        내부사용 변수 설정
+        :param latency_ms: 응답 지연시간(밀리초)
+        :param jitter_ms: 응답 지연시간 편차(밀리초)
+        :param total_hits: 검색 결과 전체 건수
+        :param scroll_pages: scroll, SQL cursor 로 조회 가능한 페이지 수
+        :param count_latency_ms: 전체 건수를 모두 계산할 때 추가되는 지연시간(밀리초, 계산한 건수 비율만큼 적용)
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.total_hits = total_hits
+        self.scroll_pages = scroll_pages
+        self.count_latency_ms = count_latency_ms
+        self.scrolls = {}
+        self.sequence = itertools.count(1)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def sleep(self):
+        """
+        설정된 지연시간 만큼 대기
+        :return:
+        """
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def sleep_count(self, track_total_hits):
+        """
+        전체 건수 계산 지연시간 만큼 대기(track_total_hits 로 계산하는 건수 비율 적용)
+        :param track_total_hits: true, false, 계산할 최대 건수
+        :return:
+        """
+        if self.count_latency_ms <= 0 or self.total_hits <= 0 or track_total_hits is False:
+            return
+        counted = self.total_hits if track_total_hits is True else min(int(track_total_hits), self.total_hits)
+        time.sleep(self.count_latency_ms * counted / self.total_hits / 1000.0)
+
+    def open_scroll(self):
+        """
+        scroll_id 발급
+        :return: scroll_id
+        """
+        with self.lock:
+            scroll_id = "fake-scroll-%d" % next(self.sequence)
+            self.scrolls[scroll_id] = self.scroll_pages - 1
+        return scroll_id
+
+    def next_scroll(self, scroll_id):
+        """
+        scroll 다음 페이지 확인(알 수 없는 scroll_id 는 첫 페이지부터 시작)
+        :param scroll_id: scroll_id
+        :return: True : 조회할 페이지 있음
+        """
+        with self.lock:
+            remain = self.scrolls.get(scroll_id, self.scroll_pages)
+            if remain <= 0:
+                self.scrolls.pop(scroll_id, None)
+                return False
+            self.scrolls[scroll_id] = remain - 1
+            return True
+
+
+# 검색 결과 문서
+def make_document(num):
+    return {
+        "group_nm": "생활용품",
+        "goodsname_nm": "테스트 상품 %d" % num,
+        "goods_id": "G%08d" % num,
+        "cate1_code": "C%03d" % (num % 20),
+        "cate2_code": "C%05d" % (num % 200),
+        "content": "상품 상세 설명 %d" % num,
+        "description": "상품 요약 설명",
+        "best_yn": "Y" if num % 3 == 0 else "N",
+        "new_yn": "Y" if num % 5 == 0 else "N",
+        "user_id": "user%04d" % (num % 1000),
+        "reg_date": "2020-01-%02dT10:00:00" % (num % 28 + 1)
+    }
+
+
+# 전체 건수 : Elasticsearch 7 과 같이 track_total_hits 상한을 넘으면 relation gte, false 이면 None
+def make_total_hits(total_hits, track_total_hits=10000):
+    if track_total_hits is False:
+        return None
+    if track_total_hits is not True and total_hits > int(track_total_hits):
+        return {"value": int(track_total_hits), "relation": "gte"}
+    return {"value": total_hits, "relation": "eq"}
+
+
+# 요청 body 의 track_total_hits(search template 은 params 사용), 없으면 Elasticsearch 기본값(10000)
+def get_track_total_hits(body):
+    if isinstance(body, dict) and 'params' in body:
+        body = body['params']
+    if isinstance(body, dict):
+        return body.get('track_total_hits', 10000)
+    return 10000
+
+
+# 검색 응답
+def make_search_response(state, size, start=0, track_total_hits=10000):
+    size = max(min(size, state.total_hits - start), 0)
+    res = {
+        "took": int(state.latency_ms),
+        "timed_out": False,
+        "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+        "hits": {
+            "total": make_total_hits(state.total_hits, track_total_hits),
+            "max_score": 1.0,
+            "hits": [
+                {
+                    "_index": "search-nori-sample1",
+                    "_type": "_doc",
+                    "_id": str(start + num),
+                    "_score": 1.0,
+                    "_source": make_document(start + num),
+                    "sort": [1.0, start + num]
+                } for num in range(size)
+            ]
+        }
+    }
+    if res['hits']['total'] is None:
+        del res['hits']['total']
+    return res
+
+
+# 요청 body 의 size, from 확인(search template 은 params 사용)
+def get_size_from(body, query):
+    if isinstance(body, dict) and 'params' in body:
+        body = body['params']
+    size = 20
+    start = 0
+    if isinstance(body, dict):
+        size = int(body.get('size', size))
+        start = int(body.get('from', start))
+    if 'size' in query:
+        size = int(query['size'][0])
+    return size, start
+
+
+class FakeElasticsearchHandler(BaseHTTPRequestHandler):
+    """
+    Elasticsearch REST API 대체 처리
+    """
+    protocol_version = 'HTTP/1.1'
+    # header, body 를 나눠서 전송하므로 keep-alive 연결에서 Nagle + delayed ACK 지연(40ms)이 생기지 않도록 설정
+    disable_nagle_algorithm = True
+    state = None
+
+    def log_message(self, format, *args):
+        """
+        요청 로그 출력하지 않음
+        """
+        pass
+
+    def read_body(self):
+        """
+        요청 body 조회(JSON 또는 NDJSON)
+        :return: body 문자열
+        """
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length).decode('UTF-8') if length else ""
+
+    def send_json(self, data, status=200):
+        """
+        JSON 응답 전송
+        :param data: 응답 데이터
+        :param status: HTTP status
+        :return:
+        """
+        payload = json.dumps(data, ensure_ascii=False).encode('UTF-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('X-Elastic-Product', 'Elasticsearch')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def handle_request(self):
+        """
+        요청 경로에 따라 응답 생성
+        :return:
+        """
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        path = url.path.rstrip('/')
+        text = self.read_body()
+        state = self.state
+        with state.lock:
+            state.requests += 1
+        body = None
+        if text and not path.endswith('_msearch'):
+            try:
+                body = json.loads(text)
+            except ValueError:
+                body = None
+        state.sleep()
+        if path == '':
+            return self.send_json({
+                "name": "fake-node",
+                "cluster_name": "fake-cluster",
+                "version": {"number": "7.17.0", "build_flavor": "default"},
+                "tagline": "You Know, for Search"
+            })
+        if path.startswith('/_scripts/'):
+            if self.command == 'GET':
+                return self.send_json({"_id": path.split('/')[-1], "found": True})
+            return self.send_json({"acknowledged": True})
+        if path == '/_pit':
+            return self.send_json({"succeeded": True, "num_freed": 1})
+        if path.endswith('/_pit'):
+            return self.send_json({"id": "fake-pit-%d" % next(state.sequence)})
+        if path == '/_search/scroll':
+            if self.command == 'DELETE':
+                return self.send_json({"succeeded": True, "num_freed": 1})
+            scroll_id = (body or {}).get('scroll_id') or query.get('scroll_id', [''])[0]
+            size = 20
+            if state.next_scroll(scroll_id):
+                res = make_search_response(state, size)
+            else:
+                res = make_search_response(state, 0)
+            res['_scroll_id'] = scroll_id
+            return self.send_json(res)
+        if path.endswith('/_msearch') or path.endswith('/_msearch/template'):
+            lines = [line for line in text.splitlines() if line.strip()]
+            responses = []
+            for line in lines[1::2]:
+                search_body = json.loads(line)
+                size, start = get_size_from(search_body, {})
+                res = make_search_response(state, size, start, get_track_total_hits(search_body))
+                res['status'] = 200
+                responses.append(res)
+            return self.send_json({"took": int(state.latency_ms), "responses": responses})
+        if path.startswith('/_render/template'):
+            params = (body or {}).get('params', {})
+            return self.send_json({"template_output": {
+                "from": params.get('from', 0),
+                "size": params.get('size', 10),
+                "track_total_hits": params.get('track_total_hits', True),
+                "query": {"match": {"goodsname_nm": {"query": params.get('keyword', '')}}}
+            }})
+        if path.endswith('/_search') or path.endswith('/_search/template'):
+            size, start = get_size_from(body, query)
+            # scroll 은 전체 건수를 항상 계산
+            track_total_hits = True if 'scroll' in query else get_track_total_hits(body)
+            state.sleep_count(track_total_hits)
+            res = make_search_response(state, size, start, track_total_hits)
+            if 'scroll' in query:
+                res['_scroll_id'] = state.open_scroll()
+            if isinstance(body, dict) and 'pit' in body:
+                res['pit_id'] = body['pit']['id']
+            if isinstance(body, dict) and body.get('profile'):
+                res['profile'] = {"shards": []}
+            if isinstance(body, dict) and 'aggs' in body:
+                buckets = [{"key": "Y", "doc_count": 10}, {"key": "N", "doc_count": 5}]
+                res['aggregations'] = {
+                    name: {"doc_count": 15, "values": {"buckets": buckets}} if 'filter' in agg else {"buckets": buckets}
+                    for name, agg in body['aggs'].items()
+                }
+            if isinstance(body, dict) and 'suggest' in body:
+                res['suggest'] = {
+                    name: [{
+                        "text": suggest.get('prefix', ''),
+                        "options": [
+                            {"text": "%s 테스트 상품 %d" % (suggest.get('prefix', ''), num)}
+                            for num in range(suggest.get('completion', {}).get('size', 5))
+                        ]
+                    }]
+                    for name, suggest in body['suggest'].items()
+                }
+            return self.send_json(res)
+        if path.endswith('/translate'):
+            return self.send_json({
+                "size": 1000,
+                "query": {"bool": {"must": [{"range": {"@timestamp": {"gte": "2020-01-01T00:00:00"}}}]}},
+                "_source": False,
+                "sort": [{"accessPointId": {"order": "asc"}}]
+            })
+        if path.endswith('/close'):
+            return self.send_json({"succeeded": True})
+        if path in ('/_sql', '/_xpack/sql'):
+            fetch_size = int((body or {}).get('fetch_size', 20))
+            cursor = (body or {}).get('cursor')
+            if cursor is None:
+                cursor = state.open_scroll()
+                more = True
+            else:
+                more = state.next_scroll(cursor)
+            res = {
+                "rows": [[num, "user%04d" % num, "AP%03d" % (num % 100)] for num in range(fetch_size if more else 0)]
+            }
+            if 'query' in (body or {}):
+                res['columns'] = [
+                    {"name": "id", "type": "long"},
+                    {"name": "username", "type": "text"},
+                    {"name": "accessPointId", "type": "keyword"}
+                ]
+            if more:
+                res['cursor'] = cursor
+            return self.send_json(res)
+        if '/_reload_search_analyzers' in path or path.endswith('/_cache/clear'):
+            return self.send_json({"_shards": {"total": 1, "successful": 1, "failed": 0}})
+        return self.send_json({"acknowledged": True})
+
+    do_GET = handle_request
+    do_POST = handle_request
+    do_PUT = handle_request
+    do_DELETE = handle_request
+    do_HEAD = handle_request
+
+
+# 대체 서버 실행(thread), 사용한 port 와 server 반환
+# ssl_context 를 전달하면 https 로 실행
+def start_fake_elasticsearch(port=0, latency_ms=5.0, jitter_ms=0.0, total_hits=1000, scroll_pages=3,
+                             ssl_context=None, count_latency_ms=0.0):
+    state = FakeElasticsearchState(latency_ms, jitter_ms, total_hits, scroll_pages, count_latency_ms)
+    handler = type('BoundFakeElasticsearchHandler', (FakeElasticsearchHandler,), {"state": state})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    if ssl_context is not None:
+        # handshake 는 요청 처리 thread 에서 수행(accept thread 에서 순서대로 처리하지 않도록)
+        server.socket = ssl_context.wrap_socket(server.socket, server_side=True, do_handshake_on_connect=False)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, state
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="fake elasticsearch server")
+    arg_parser.add_argument('--port', type=int, default=9200)
+    arg_parser.add_argument('--latency-ms', type=float, default=5.0)
+    arg_parser.add_argument('--jitter-ms', type=float, default=0.0)
+    arg_parser.add_argument('--total-hits', type=int, default=1000)
+    arg_parser.add_argument('--scroll-pages', type=int, default=3)
+    arg_parser.add_argument('--count-latency-ms', type=float, default=0.0,
+                            help="extra latency when every hit is counted (track_total_hits: true)")
+    options = arg_parser.parse_args()
+    fake_server, _ = start_fake_elasticsearch(
+        options.port, options.latency_ms, options.jitter_ms, options.total_hits, options.scroll_pages,
+        count_latency_ms=options.count_latency_ms)
+    print("fake elasticsearch : http://127.0.0.1:%d" % fake_server.server_address[1])
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake_server.shutdown()
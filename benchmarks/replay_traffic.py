@@ -0,0 +1,335 @@
+# 운영 요청 기록(traffic capture) replay 도구
+# app.py 의 traffic_capture 로 기록한 JSONL 파일의 요청을 대상 서버로 기록된 간격(--speed 배율)으로 다시 요청하고
+# 응답시간 분포(p50/p90/p95/p99), route 별 결과를 출력
+# --baseline 을 지정하면 같은 요청을 기준 서버에도 보내서 응답 결과를 비교(Query DSL 변경 전후 결과 차이 확인)
+# 실행 명령어 :
+# python benchmarks/replay_traffic.py /var/log/search_restapi/traffic.*.jsonl --target 127.0.0.1:5000 --speed 2
+# python benchmarks/replay_traffic.py traffic.1.jsonl --target 127.0.0.1:5001 --baseline 127.0.0.1:5000 --speed 0
+from http.client import HTTPException
+from urllib.parse import urlencode, quote, urlsplit
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_benchmarks import BenchClient, percentile  # noqa: E402
+
+# replay 하지 않는 요청 : 데이터를 변경하는 요청, 이전 응답의 scroll_id 가 필요한 요청
+skip_routes = {
+    ('POST', '/kafka_api'),
+    ('POST', '/kafka_api/<string:topic>'),
+    ('DELETE', '/cache'),
+    ('DELETE', '/cache/<string:index>'),
+    ('DELETE', '/scroll'),
+    ('POST', '/keyword/<string:keyword_p>'),
+    ('DELETE', '/keyword/<string:keyword_p>'),
+    ('POST', '/text/<string:keyword_p>'),
+    ('DELETE', '/text/<string:keyword_p>')
+}
+# 이전 응답의 값이 필요한 요청 파라메터(기록 시점의 값은 만료됨)
+stateful_args = ('cursor', 'scroll_id')
+# 응답 비교에서 제외하는 값(요청마다 달라지는 값)
+volatile_keys = ('scroll_id', 'cursor', 'profile')
+
+
+# replay 제외 사유, replay 대상이면 None
+def get_skip_reason(record):
+    if (record.get('method'), record.get('route')) in skip_routes:
+        return 'route'
+    if record.get('route') is None:
+        return 'unmatched'
+    if record.get('body_skipped'):
+        return 'body_skipped'
+    params = dict(record.get('args') or {})
+    params.update(record.get('form') or {})
+    if any(params.get(name) for name in stateful_args):
+        return 'stateful'
+    return None
+
+
+# 기록 파일 조회 : 기록 시간 순서로 정렬, replay 제외 건수는 사유별로 집계
+def load_records(filenames, limit=None):
+    records = []
+    skipped = {}
+    for filename in filenames:
+        with open(filename, encoding='UTF-8') as record_file:
+            for line in record_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    skipped['invalid'] = skipped.get('invalid', 0) + 1
+                    continue
+                reason = get_skip_reason(record)
+                if reason is not None:
+                    skipped[reason] = skipped.get(reason, 0) + 1
+                    continue
+                records.append(record)
+    records.sort(key=lambda item: item.get('ts', 0))
+    if limit:
+        records = records[:limit]
+    return records, skipped
+
+
+# 기록으로 요청 생성
+def make_replay_request(record):
+    path = quote(record['path'])
+    if record.get('args'):
+        path += '?' + urlencode(record['args'])
+    headers = {}
+    body = None
+    if 'json' in record:
+        body = json.dumps(record['json']).encode('UTF-8')
+        headers['Content-Type'] = 'application/json'
+    elif 'form' in record:
+        body = urlencode(record['form']).encode('UTF-8')
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    return record['method'], path, body, headers
+
+
+# host:port 또는 URL 을 (host, port) 로 변환
+def parse_server(value):
+    url = urlsplit(value if '//' in value else '//' + value)
+    return url.hostname, url.port or 80
+
+
+# 응답 비교용 값 : JSON 은 요청마다 달라지는 값을 제외, JSON 이 아니면 body 그대로 사용
+def normalize_response(data):
+    try:
+        value = json.loads(data)
+    except ValueError:
+        return data
+
+    def strip(item):
+        if isinstance(item, dict):
+            return {key: strip(child) for key, child in item.items() if key not in volatile_keys}
+        if isinstance(item, list):
+            return [strip(child) for child in item]
+        return item
+
+    return strip(value)
+
+
+# 처음 달라지는 위치와 값(같으면 None)
+def first_difference(target, baseline, path='$'):
+    if type(target) is not type(baseline):
+        return path, target, baseline
+    if isinstance(target, dict):
+        for key in sorted(set(target) | set(baseline)):
+            if key not in target or key not in baseline:
+                return "%s.%s" % (path, key), target.get(key), baseline.get(key)
+            diff = first_difference(target[key], baseline[key], "%s.%s" % (path, key))
+            if diff is not None:
+                return diff
+        return None
+    if isinstance(target, list):
+        if len(target) != len(baseline):
+            return "%s.length" % path, len(target), len(baseline)
+        for index, (target_item, baseline_item) in enumerate(zip(target, baseline)):
+            diff = first_difference(target_item, baseline_item, "%s[%d]" % (path, index))
+            if diff is not None:
+                return diff
+        return None
+    if target != baseline:
+        return path, target, baseline
+    return None
+
+
+# 비교 결과 출력용 값(긴 값은 200자까지)
+def shorten(value):
+    text = json.dumps(value, ensure_ascii=False) if not isinstance(value, (str, bytes)) else str(value)
+    return text if len(text) <= 200 else text[:200] + '...'
+
+
+# 기록된 간격으로 요청(speed 배율, 0 이면 대기 없이 요청), 동시 요청은 concurrency 개 thread 로 제한
+# 모든 thread 가 요청 중이면 예정 시간보다 늦게 요청되며 지연시간(lag)으로 기록
+def replay(records, target, baseline, speed, concurrency, timeout):
+    work_queue = queue.Queue(maxsize=concurrency)
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        target_client = BenchClient(target[1], timeout, target[0])
+        baseline_client = BenchClient(baseline[1], timeout, baseline[0]) if baseline else None
+        local_results = []
+        try:
+            while True:
+                item = work_queue.get()
+                if item is None:
+                    break
+                record, scheduled = item
+                method, path, body, headers = make_replay_request(record)
+                result = {
+                    "route": "%s %s" % (method, record['route']),
+                    "captured_ms": record.get('elapsed_ms'),
+                    "lag_ms": max(time.perf_counter() - scheduled, 0) * 1000
+                }
+                start = time.perf_counter()
+                try:
+                    status, data = target_client.request(method, path, body, headers)
+                    result['latency_ms'] = (time.perf_counter() - start) * 1000
+                    result['status'] = status
+                except (OSError, HTTPException) as e:
+                    result['error'] = str(e)
+                    local_results.append(result)
+                    continue
+                if baseline_client is not None:
+                    try:
+                        baseline_status, baseline_data = baseline_client.request(method, path, body, headers)
+                    except (OSError, HTTPException) as e:
+                        result['baseline_error'] = str(e)
+                    else:
+                        if baseline_status != status:
+                            result['diff'] = ("$status", status, baseline_status)
+                        else:
+                            result['diff'] = first_difference(
+                                normalize_response(data), normalize_response(baseline_data))
+                        if result['diff'] is not None:
+                            result['path'] = path
+                local_results.append(result)
+        finally:
+            target_client.close()
+            if baseline_client is not None:
+                baseline_client.close()
+            with lock:
+                results.extend(local_results)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    first_ts = records[0].get('ts', 0) if records else 0
+    for record in records:
+        scheduled = started
+        if speed > 0:
+            scheduled = started + (record.get('ts', first_ts) - first_ts) / speed
+            wait = scheduled - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        work_queue.put((record, scheduled))
+    for _ in threads:
+        work_queue.put(None)
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+# 응답시간 분포
+def distribution(values):
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return None
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3),
+        "p50": round(percentile(values, 50), 3),
+        "p90": round(percentile(values, 90), 3),
+        "p95": round(percentile(values, 95), 3),
+        "p99": round(percentile(values, 99), 3),
+        "max": round(values[-1], 3)
+    }
+
+
+# 전체, route 별 결과 요약
+def summarize(results, elapsed, max_diff_samples=20):
+    routes = {}
+    for result in results:
+        routes.setdefault(result['route'], []).append(result)
+    diffs = [result for result in results if result.get('diff')]
+    return {
+        "requests": len(results),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else None,
+        "errors": sum(1 for result in results if 'error' in result),
+        "status": count_status(results),
+        "latency_ms": distribution(result.get('latency_ms') for result in results),
+        "captured_latency_ms": distribution(result.get('captured_ms') for result in results),
+        "lag_ms": distribution(result['lag_ms'] for result in results),
+        "diffs": len(diffs),
+        "diff_samples": [
+            {
+                "route": result['route'],
+                "path": result['path'],
+                "at": result['diff'][0],
+                "target": shorten(result['diff'][1]),
+                "baseline": shorten(result['diff'][2])
+            }
+            for result in diffs[:max_diff_samples]
+        ],
+        "routes": {
+            route: {
+                "requests": len(items),
+                "status": count_status(items),
+                "latency_ms": distribution(item.get('latency_ms') for item in items),
+                "captured_latency_ms": distribution(item.get('captured_ms') for item in items),
+                "diffs": sum(1 for item in items if item.get('diff'))
+            }
+            for route, items in sorted(routes.items())
+        }
+    }
+
+
+# 응답 status 별 건수
+def count_status(results):
+    statuses = {}
+    for result in results:
+        key = str(result.get('status', 'error'))
+        statuses[key] = statuses.get(key, 0) + 1
+    return statuses
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="search restapi traffic replay")
+    arg_parser.add_argument('files', nargs='+', help="traffic capture JSONL files")
+    arg_parser.add_argument('--target', required=True, help="host:port")
+    arg_parser.add_argument('--baseline', help="host:port to compare results with")
+    arg_parser.add_argument('--speed', type=float, default=1.0, help="1 : captured timing, 2 : twice as fast, 0 : no wait")
+    arg_parser.add_argument('--concurrency', type=int, default=8)
+    arg_parser.add_argument('--limit', type=int)
+    arg_parser.add_argument('--timeout', type=float, default=30)
+    arg_parser.add_argument('--output')
+    options = arg_parser.parse_args()
+
+    replay_records, skipped_records = load_records(options.files, options.limit)
+    if not replay_records:
+        sys.exit("no replayable records (skipped : %s)" % skipped_records)
+    replay_results, replay_elapsed = replay(
+        replay_records,
+        parse_server(options.target),
+        parse_server(options.baseline) if options.baseline else None,
+        options.speed,
+        options.concurrency,
+        options.timeout
+    )
+    report = summarize(replay_results, replay_elapsed)
+    report['skipped'] = skipped_records
+    report['options'] = {
+        "target": options.target,
+        "baseline": options.baseline,
+        "speed": options.speed,
+        "concurrency": options.concurrency
+    }
+
+    print("%-50s %7s %9s %9s %9s %9s %6s" % ("route", "count", "p50(ms)", "p95(ms)", "p99(ms)", "orig p50", "diffs"))
+    for route_name, row in report['routes'].items():
+        latency = row['latency_ms'] or {}
+        captured = row['captured_latency_ms'] or {}
+        print("%-50s %7d %9s %9s %9s %9s %6d" % (
+            route_name, row['requests'], latency.get('p50'), latency.get('p95'), latency.get('p99'),
+            captured.get('p50'), row['diffs']
+        ))
+    total = report['latency_ms'] or {}
+    print("total %d requests, %.1f rps, p50 %s ms, p99 %s ms, lag p99 %s ms, errors %d, diffs %d, skipped %s" % (
+        report['requests'], report['throughput_rps'] or 0, total.get('p50'), total.get('p99'),
+        (report['lag_ms'] or {}).get('p99'), report['errors'], report['diffs'], report['skipped']
+    ))
+    for sample in report['diff_samples']:
+        print("diff %s %s at %s : %s != %s" % (
+            sample['route'], sample['path'], sample['at'], sample['target'], sample['baseline']))
+    if options.output:
+        with open(options.output, 'w', encoding='UTF-8') as output_file:
+            json.dump(report, output_file, ensure_ascii=False, indent=2)
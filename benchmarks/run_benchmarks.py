@@ -0,0 +1,456 @@
+# API 성능 벤치마크
+# 대체 Elasticsearch(fake_elasticsearch.py)와 API 서버(serve_app.py)를 subprocess 로 실행하고
+# 등록된 route 별로 동시 요청 수를 바꿔가며 처리량, 응답시간(p50/p95/p99), 요청 당 서버 CPU 사용시간, 메모리 할당량을 측정
+# 결과는 JSON 으로 저장하여 커밋 간 비교에 사용
+# 실행 명령어 :
+# python benchmarks/run_benchmarks.py --modes wsgi asgi --concurrency 1 8 32 --requests 500 --output bench_result.json
+# python benchmarks/run_benchmarks.py --only keyword_paging text_paging --latency-ms 20
+# 전체 건수 계산 방식 비교(대용량 Index 로 측정) :
+# python benchmarks/run_benchmarks.py --modes wsgi --es-url http://127.0.0.1:9200 --only keyword_paging_count_exact \
+#     keyword_paging_count_capped keyword_paging_count_none keyword_paging_pages_recount keyword_paging_pages_count_reused
+from http.client import HTTPConnection, HTTPException
+from urllib.parse import urlencode, quote
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(bench_dir)
+
+# 벤치마크 대상 요청
+# route : 등록된 route(serve_app.normalize_route 형식), path 의 {n} 은 요청 순번으로 변경(캐시 미적용 조회)
+# modes : 실행 가능한 모드, skip : 기본 실행에서 제외하는 사유
+# headers : 요청 header, conditional : 이전 응답의 ETag 를 If-None-Match 로 전달(304 응답 측정)
+bench_scenarios = [
+    {"name": "hello", "method": "GET", "route": "/", "path": "/"},
+    {"name": "keyword_scroll_open", "method": "GET", "route": "/keyword/{keyword_p}", "path": "/keyword/상품{n}"},
+    {"name": "keyword_scroll_next", "method": "POST", "route": "/keyword/{keyword_p}", "path": "/keyword/상품",
+     "form": {"scroll_id": "fake-scroll-bench"}},
+    {"name": "keyword_scroll_clear", "method": "DELETE", "route": "/keyword/{keyword_p}", "path": "/keyword/상품",
+     "form": {"scroll_id": "fake-scroll-bench"}},
+    {"name": "text_scroll_open", "method": "GET", "route": "/text/{keyword_p}", "path": "/text/상품{n}"},
+    {"name": "text_scroll_next", "method": "POST", "route": "/text/{keyword_p}", "path": "/text/상품",
+     "form": {"scroll_id": "fake-scroll-bench"}},
+    {"name": "text_scroll_clear", "method": "DELETE", "route": "/text/{keyword_p}", "path": "/text/상품",
+     "form": {"scroll_id": "fake-scroll-bench"}},
+    {"name": "scroll_clear_all", "method": "DELETE", "route": "/scroll", "path": "/scroll"},
+    {"name": "keyword_paging", "method": "GET", "route": "/keyword/{page}/{keyword_p}", "path": "/keyword/1/상품{n}"},
+    {"name": "keyword_paging_cached", "method": "GET", "route": "/keyword/{page}/{keyword_p}",
+     "path": "/keyword/1/상품"},
+    {"name": "keyword_paging_cursor", "method": "POST", "route": "/keyword/{page}/{keyword_p}",
+     "path": "/keyword/1/상품{n}", "form": {"paging": "cursor"}},
+    {"name": "keyword_paging_profile", "method": "GET", "route": "/keyword/{page}/{keyword_p}",
+     "path": "/keyword/1/상품{n}", "query": {"profile": "true"}},
+    {"name": "text_paging", "method": "GET", "route": "/text/{page}/{keyword_p}", "path": "/text/1/상품{n}"},
+    {"name": "text_paging_cached", "method": "GET", "route": "/text/{page}/{keyword_p}", "path": "/text/1/상품"},
+    {"name": "sql_translate_search", "method": "POST", "route": "/search/{code}", "path": "/search/1",
+     "form": {"keyword": "AP{n}", "pageIndex": "1", "pageSize": "20"}},
+    {"name": "sql_search", "method": "POST", "route": "/sql/{code}", "path": "/sql/1",
+     "form": {"keyword": "AP{n}", "pageSize": "20"}},
+    {"name": "batch", "method": "POST", "route": "/batch", "path": "/batch",
+     "json": {"queries": [{"keyword": "상품{n}"}, {"keyword": "상품{n}", "type": "text"}, {"keyword": "상품{n}", "page": 2}]}},
+    {"name": "export", "method": "GET", "route": "/export/{keyword_p}", "path": "/export/상품{n}",
+     "query": {"slices": "2", "pageSize": "100"}, "modes": ["wsgi"]},
+    {"name": "cache_invalidate", "method": "DELETE", "route": "/cache", "path": "/cache", "modes": ["wsgi"]},
+    {"name": "cache_invalidate_index", "method": "DELETE", "route": "/cache/{index}",
+     "path": "/cache/search-nori-sample1", "modes": ["wsgi"]},
+    {"name": "stats_pool", "method": "GET", "route": "/stats/pool", "path": "/stats/pool", "modes": ["wsgi"]},
+    {"name": "stats_cache", "method": "GET", "route": "/stats/cache", "path": "/stats/cache", "modes": ["wsgi"]},
+    {"name": "stats_scroll", "method": "GET", "route": "/stats/scroll", "path": "/stats/scroll", "modes": ["wsgi"]},
+    {"name": "stats_singleflight", "method": "GET", "route": "/stats/singleflight", "path": "/stats/singleflight",
+     "modes": ["wsgi"]},
+    {"name": "stats_kafka", "method": "GET", "route": "/stats/kafka", "path": "/stats/kafka", "modes": ["wsgi"]},
+    {"name": "stats_slowquery", "method": "GET", "route": "/stats/slowquery", "path": "/stats/slowquery",
+     "modes": ["wsgi"]},
+    {"name": "keyword_paging_gzip", "method": "GET", "route": "/keyword/{page}/{keyword_p}",
+     "path": "/keyword/1/상품{n}", "headers": {"Accept-Encoding": "gzip"}},
+    {"name": "keyword_paging_not_modified", "method": "GET", "route": "/keyword/{page}/{keyword_p}",
+     "path": "/keyword/1/상품", "headers": {"Accept-Encoding": "gzip"}, "conditional": True},
+    {"name": "keyword_paging_facets", "method": "GET", "route": "/keyword/{page}/{keyword_p}",
+     "path": "/keyword/1/상품{n}", "query": {"facets": "all", "best_yn": "Y"}},
+    {"name": "keyword_paging_count_exact", "method": "GET", "route": "/keyword/{page}/{keyword_p}",
+     "path": "/keyword/1/상품{n}", "query": {"count": "exact"}},
+    {"name": "keyword_paging_count_capped", "method": "GET", "route": "/keyword/{page}/{keyword_p}",
+     "path": "/keyword/1/상품{n}", "query": {"count": "100"}},
+    {"name": "keyword_paging_count_none", "method": "GET", "route": "/keyword/{page}/{keyword_p}",
+     "path": "/keyword/1/상품{n}", "query": {"count": "none"}},
+    {"name": "keyword_paging_pages_recount", "method": "GET", "route": "/keyword/{page}/{keyword_p}",
+     "path": "/keyword/{n}/상품{n}", "query": {"count": "exact"}},
+    {"name": "keyword_paging_pages_count_reused", "method": "GET", "route": "/keyword/{page}/{keyword_p}",
+     "path": "/keyword/{n}/상품", "query": {"count": "exact"}},
+    {"name": "facets_all", "method": "GET", "route": "/facets", "path": "/facets"},
+    {"name": "facets_keyword", "method": "GET", "route": "/facets/{keyword_p}", "path": "/facets/상품{n}",
+     "query": {"best_yn": "Y", "new_yn": "N"}},
+    {"name": "suggest_hot", "method": "GET", "route": "/suggest/{prefix}", "path": "/suggest/상품"},
+    {"name": "suggest_cold", "method": "GET", "route": "/suggest/{prefix}", "path": "/suggest/상품{n}"},
+    {"name": "stats_suggest", "method": "GET", "route": "/stats/suggest", "path": "/stats/suggest", "modes": ["wsgi"]},
+    {"name": "stats_nodes", "method": "GET", "route": "/stats/nodes", "path": "/stats/nodes", "modes": ["wsgi"]},
+    {"name": "stats_startup", "method": "GET", "route": "/stats/startup", "path": "/stats/startup", "modes": ["wsgi"]},
+    {"name": "stats_capture", "method": "GET", "route": "/stats/capture", "path": "/stats/capture", "modes": ["wsgi"]},
+    {"name": "metrics", "method": "GET", "route": "/metrics", "path": "/metrics", "modes": ["wsgi"]},
+    {"name": "kafka_send", "method": "POST", "route": "/kafka_api", "path": "/kafka_api",
+     "form": {"topic": "bench", "field": "value{n}"}, "modes": ["wsgi"], "skip": "requires kafka broker"},
+    {"name": "kafka_ingest", "method": "POST", "route": "/kafka_api/{topic}", "path": "/kafka_api/bench",
+     "json": {"records": [{"value": "{n}"}]}, "modes": ["wsgi"], "skip": "requires kafka broker"}
+]
+
+
+# 사용하지 않는 port 조회
+def get_free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+# 현재 커밋(비교 기준)
+def get_git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=repo_dir, stderr=subprocess.DEVNULL
+        ).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# 요청 순번 적용
+def fill_sequence(value, num):
+    if isinstance(value, str):
+        return value.replace('{n}', str(num))
+    if isinstance(value, dict):
+        return {key: fill_sequence(item, num) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill_sequence(item, num) for item in value]
+    return value
+
+
+# 요청 생성 : method, url, body, headers
+def make_request(scenario, num):
+    path = quote(fill_sequence(scenario['path'], num))
+    if 'query' in scenario:
+        path += '?' + urlencode(fill_sequence(scenario['query'], num))
+    headers = dict(scenario.get('headers', {}))
+    body = None
+    if 'json' in scenario:
+        body = json.dumps(fill_sequence(scenario['json'], num)).encode('UTF-8')
+        headers['Content-Type'] = 'application/json'
+    elif 'form' in scenario:
+        body = urlencode(fill_sequence(scenario['form'], num)).encode('UTF-8')
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    return scenario['method'], path, body, headers
+
+
+class BenchClient:
+    """
+    keep-alive connection 을 사용하는 HTTP client(thread 별 1개)
+    """
+    def __init__(self, port, timeout=30, host='127.0.0.1'):
+        """
+        내부사용 변수 설정
+        :param port: API 서버 port
+        :param timeout: 요청 제한시간(초)
+        :param host: API 서버 host
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.conn = None
+        self.last_headers = {}
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        요청 실행, 연결이 끊어진 경우 1번 재연결
+        :param method: HTTP method
+        :param path: 요청 경로
+        :param body: 요청 body
+        :param headers: 요청 header
+        :return: HTTP status, 응답 body
+        """
+        for retry in range(2):
+            if self.conn is None:
+                self.conn = HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=body, headers=headers or {})
+                res = self.conn.getresponse()
+                data = res.read()
+                self.last_headers = dict((name.lower(), value) for name, value in res.getheaders())
+                if res.getheader('Connection', '').lower() == 'close':
+                    self.close()
+                return res.status, data
+            except (OSError, HTTPException) as e:
+                self.close()
+                if retry:
+                    raise e
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+# 서버 통계 조회
+def get_server_stats(port):
+    client = BenchClient(port, timeout=5)
+    try:
+        status, data = client.request('GET', '/__bench__/stats')
+        return json.loads(data)
+    finally:
+        client.close()
+
+
+# subprocess 실행 후 응답할 때까지 대기
+def start_process(args, port, ready_path, wait_seconds=30):
+    process = subprocess.Popen([sys.executable] + args, cwd=repo_dir)
+    deadline = time.monotonic() + wait_seconds
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("process exited : %s" % ' '.join(args))
+        client = BenchClient(port, timeout=1)
+        try:
+            client.request('GET', ready_path)
+            return process
+        except OSError:
+            time.sleep(0.1)
+        finally:
+            client.close()
+    process.terminate()
+    raise RuntimeError("process not ready : %s" % ' '.join(args))
+
+
+# 프로세스 종료
+def stop_process(process):
+    process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# 백분위 응답시간(nearest-rank)
+def percentile(sorted_values, rate):
+    if not sorted_values:
+        return None
+    index = max(int(round(rate / 100.0 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+# 동시 요청 실행 : concurrency 개 thread 가 요청 순번을 나눠서 total 건 요청
+def run_load(port, scenario, concurrency, total, sequence):
+    latencies = []
+    statuses = {}
+    errors = []
+    received = [0]
+    lock = threading.Lock()
+    counter = itertools.count()
+
+    def worker():
+        client = BenchClient(port)
+        local_latencies = []
+        local_statuses = {}
+        local_received = 0
+        # 경로 별 마지막 응답 ETag(conditional scenario)
+        etags = {}
+        try:
+            while next(counter) < total:
+                method, path, body, headers = make_request(scenario, next(sequence))
+                if scenario.get('conditional') and path in etags:
+                    headers['If-None-Match'] = etags[path]
+                start = time.perf_counter()
+                try:
+                    status, data = client.request(method, path, body, headers)
+                except (OSError, HTTPException) as e:
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                local_latencies.append(time.perf_counter() - start)
+                local_statuses[status] = local_statuses.get(status, 0) + 1
+                local_received += len(data)
+                if 'etag' in client.last_headers:
+                    etags[path] = client.last_headers['etag']
+        finally:
+            client.close()
+        with lock:
+            latencies.extend(local_latencies)
+            received[0] += local_received
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return latencies, statuses, errors, elapsed, received[0]
+
+
+# scenario, 동시 요청 수 별 측정
+def measure(port, scenario, concurrency, total, warmup, sequence):
+    if warmup:
+        run_load(port, scenario, min(concurrency, warmup), warmup, sequence)
+    before = get_server_stats(port)
+    latencies, statuses, errors, elapsed, received = run_load(port, scenario, concurrency, total, sequence)
+    after = get_server_stats(port)
+    latencies.sort()
+    handled = max(after['requests'] - before['requests'], 1)
+    failed = len(errors) + sum(count for status, count in statuses.items() if status >= 400)
+    return {
+        "scenario": scenario['name'],
+        "method": scenario['method'],
+        "route": scenario['route'],
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": failed,
+        "status": {str(status): count for status, count in sorted(statuses.items())},
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+            "p50": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+            "p95": round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+            "p99": round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+            "max": round(latencies[-1] * 1000, 3) if latencies else None
+        },
+        # 서버 프로세스 전체 CPU 사용시간(요청 처리, HTTP 서버, Elasticsearch 통신 포함)을 처리 요청 수로 나눈 값
+        "cpu_ms_per_request": round((after['cpu_seconds'] - before['cpu_seconds']) / handled * 1000, 4),
+        # 응답 body 평균 크기(압축, 304 응답의 전송량 비교)
+        "bytes_per_response": round(received / len(latencies), 1) if latencies else None,
+        "error_samples": errors[:5]
+    }
+
+
+# tracemalloc 을 적용한 서버에서 순차 요청으로 요청 당 메모리 할당량 측정
+def measure_alloc(port, scenario, total, sequence):
+    run_load(port, scenario, 1, 3, sequence)
+    before = get_server_stats(port)
+    run_load(port, scenario, 1, total, sequence)
+    after = get_server_stats(port)
+    samples = max(after['alloc_samples'] - before['alloc_samples'], 1)
+    return {
+        "alloc_peak_kb_per_request": round((after['alloc_peak_bytes'] - before['alloc_peak_bytes']) / samples / 1024, 2),
+        "alloc_net_kb_per_request": round((after['alloc_net_bytes'] - before['alloc_net_bytes']) / samples / 1024, 2)
+    }
+
+
+# 서버에 등록되었지만 벤치마크 scenario 가 없는 route
+def find_uncovered_routes(routes, scenarios):
+    covered = set((scenario['method'], scenario['route']) for scenario in scenarios)
+    return [route for route in routes if tuple(route) not in covered]
+
+
+# 모드 별 벤치마크 실행
+def run_mode(mode, es_url, scenarios, options):
+    port = get_free_port()
+    server_args = [os.path.join(bench_dir, 'serve_app.py'), '--mode', mode, '--port', str(port), '--es-url', es_url]
+    results = []
+    process = start_process(server_args, port, '/__bench__/stats')
+    try:
+        routes = get_server_stats(port)['routes']
+        sequence = itertools.count()
+        for scenario in scenarios:
+            if mode not in scenario.get('modes', ['wsgi', 'asgi']):
+                continue
+            for concurrency in options.concurrency:
+                result = measure(port, scenario, concurrency, options.requests, options.warmup, sequence)
+                result['mode'] = mode
+                results.append(result)
+                print("%-5s %-24s c=%-3d %9.1f rps  p50 %8.2f ms  p99 %8.2f ms  cpu %7.3f ms  err %d" % (
+                    mode, scenario['name'], concurrency, result['throughput_rps'] or 0,
+                    result['latency_ms']['p50'] or 0, result['latency_ms']['p99'] or 0,
+                    result['cpu_ms_per_request'], result['errors']
+                ), file=sys.stderr)
+    finally:
+        stop_process(process)
+    if options.alloc_requests:
+        port = get_free_port()
+        server_args[server_args.index('--port') + 1] = str(port)
+        process = start_process(server_args + ['--trace-alloc'], port, '/__bench__/stats')
+        try:
+            sequence = itertools.count()
+            for scenario in scenarios:
+                if mode not in scenario.get('modes', ['wsgi', 'asgi']):
+                    continue
+                alloc = measure_alloc(port, scenario, options.alloc_requests, sequence)
+                for result in results:
+                    if result['scenario'] == scenario['name']:
+                        result.update(alloc)
+        finally:
+            stop_process(process)
+    return results, find_uncovered_routes(routes, bench_scenarios)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="search restapi benchmark")
+    arg_parser.add_argument('--modes', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+    arg_parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8, 32])
+    arg_parser.add_argument('--requests', type=int, default=300, help="requests per scenario and concurrency")
+    arg_parser.add_argument('--warmup', type=int, default=20)
+    arg_parser.add_argument('--alloc-requests', type=int, default=50, help="0 : skip allocation pass")
+    arg_parser.add_argument('--latency-ms', type=float, default=5.0, help="fake elasticsearch latency")
+    arg_parser.add_argument('--jitter-ms', type=float, default=1.0)
+    arg_parser.add_argument('--total-hits', type=int, default=1000)
+    arg_parser.add_argument('--count-latency-ms', type=float, default=0.0,
+                            help="fake elasticsearch latency for counting every hit")
+    arg_parser.add_argument('--es-url', help="run against this elasticsearch instead of the fake server")
+    arg_parser.add_argument('--only', nargs='+', help="scenario names")
+    arg_parser.add_argument('--include-skipped', action='store_true', help="run scenarios that need kafka")
+    arg_parser.add_argument('--output', help="result json file(default : stdout)")
+    options = arg_parser.parse_args()
+
+    selected = [
+        scenario for scenario in bench_scenarios
+        if (options.only is None or scenario['name'] in options.only)
+        and (options.include_skipped or 'skip' not in scenario)
+    ]
+    es_process = None
+    es_url = options.es_url
+    if es_url is None:
+        es_port = get_free_port()
+        es_process = start_process([
+            os.path.join(bench_dir, 'fake_elasticsearch.py'), '--port', str(es_port),
+            '--latency-ms', str(options.latency_ms), '--jitter-ms', str(options.jitter_ms),
+            '--total-hits', str(options.total_hits), '--count-latency-ms', str(options.count_latency_ms)
+        ], es_port, '/')
+        es_url = 'http://127.0.0.1:%d' % es_port
+    report = {
+        "meta": {
+            "commit": get_git_commit(),
+            "created_at": datetime.datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "options": vars(options)
+        },
+        "skipped": [
+            {"scenario": scenario['name'], "reason": scenario['skip']}
+            for scenario in bench_scenarios if 'skip' in scenario and scenario not in selected
+        ],
+        "uncovered_routes": {},
+        "results": []
+    }
+    try:
+        for bench_mode in options.modes:
+            mode_results, uncovered = run_mode(bench_mode, es_url, selected, options)
+            report['results'].extend(mode_results)
+            report['uncovered_routes'][bench_mode] = uncovered
+            for route in uncovered:
+                print("%s : no scenario for %s %s" % (bench_mode, route[0], route[1]), file=sys.stderr)
+    finally:
+        if es_process is not None:
+            stop_process(es_process)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if options.output:
+        with open(options.output, 'w', encoding='UTF-8') as f:
+            f.write(output)
+    else:
+        print(output)
@@ -0,0 +1,233 @@
+# 벤치마크용 API 서버 실행
+# app.py(WSGI) 또는 asgi.py(ASGI)를 대체 Elasticsearch 에 연결하여 실행하고
+# /__bench__/stats 로 프로세스 CPU 사용시간, 처리 요청 수, 요청 당 메모리 할당량(--trace-alloc), 등록된 route 를 반환
+# run_benchmarks.py 에서 subprocess 로 실행
+# 실행 명령어 :
+# python benchmarks/serve_app.py --mode wsgi --port 5000 --es-url http://127.0.0.1:9200
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as search_app  # noqa: E402
+
+# 통계 조회 경로
+bench_stats_path = '/__bench__/stats'
+
+
+class BenchStats:
+    """
+    API 서버 요청 통계
+    CPU 사용시간은 프로세스 전체(process_time) 기준으로 반환하고 요청 당 사용시간은 호출한 쪽에서 계산
+    메모리 할당량은 tracemalloc 사용 시 요청 처리 중 최대 할당량(peak) 기준이며 동시 요청이 1개일 때만 정확함
+    """
+    def __init__(self, trace_alloc=False):
+        """
+        내부사용 변수 설정
+        :param trace_alloc: tracemalloc 사용 여부
+        """
+        self.trace_alloc = trace_alloc
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.alloc_samples = 0
+        self.alloc_peak_bytes = 0
+        self.alloc_net_bytes = 0
+        if trace_alloc:
+            tracemalloc.start()
+
+    def begin(self):
+        """
+        요청 처리 시작
+        :return: 시작 시점의 할당량
+        """
+        if not self.trace_alloc:
+            return None
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+    def end(self, start_bytes):
+        """
+        요청 처리 종료
+        :param start_bytes: 시작 시점의 할당량
+        :return:
+        """
+        with self.lock:
+            self.requests += 1
+            if start_bytes is None:
+                return
+            current, peak = tracemalloc.get_traced_memory()
+            self.alloc_samples += 1
+            self.alloc_peak_bytes += peak - start_bytes
+            self.alloc_net_bytes += current - start_bytes
+
+    def snapshot(self, routes):
+        """
+        통계 조회
+        :param routes: 등록된 route 목록
+        :return: 통계
+        """
+        with self.lock:
+            return {
+                "pid": os.getpid(),
+                "cpu_seconds": time.process_time(),
+                "wall_seconds": time.monotonic(),
+                "requests": self.requests,
+                "alloc_samples": self.alloc_samples,
+                "alloc_peak_bytes": self.alloc_peak_bytes,
+                "alloc_net_bytes": self.alloc_net_bytes,
+                "routes": routes
+            }
+
+
+class ClosingIterator:
+    """
+    스트리밍 응답(export)까지 처리한 뒤 요청 종료 처리
+    """
+    def __init__(self, iterable, on_close):
+        """
+        내부사용 변수 설정
+        :param iterable: WSGI 응답
+        :param on_close: 응답 종료 시 호출
+        """
+        self.iterable = iterable
+        self.on_close = on_close
+
+    def __iter__(self):
+        return iter(self.iterable)
+
+    def close(self):
+        try:
+            if hasattr(self.iterable, 'close'):
+                self.iterable.close()
+        finally:
+            self.on_close()
+
+
+class BenchWSGIMiddleware:
+    """
+    WSGI 요청 통계 수집
+    """
+    def __init__(self, wsgi_app, stats, routes):
+        """
+        내부사용 변수 설정
+        :param wsgi_app: Flask wsgi_app
+        :param stats: BenchStats
+        :param routes: 등록된 route 목록
+        """
+        self.wsgi_app = wsgi_app
+        self.stats = stats
+        self.routes = routes
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') == bench_stats_path:
+            payload = json.dumps(self.stats.snapshot(self.routes)).encode('UTF-8')
+            start_response('200 OK', [
+                ('Content-Type', 'application/json'),
+                ('Content-Length', str(len(payload)))
+            ])
+            return [payload]
+        start_bytes = self.stats.begin()
+        result = self.wsgi_app(environ, start_response)
+        return ClosingIterator(result, lambda: self.stats.end(start_bytes))
+
+
+class BenchASGIMiddleware:
+    """
+    ASGI 요청 통계 수집
+    """
+    def __init__(self, asgi_app, stats, routes):
+        """
+        내부사용 변수 설정
+        :param asgi_app: Starlette app
+        :param stats: BenchStats
+        :param routes: 등록된 route 목록
+        """
+        self.asgi_app = asgi_app
+        self.stats = stats
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.asgi_app(scope, receive, send)
+        if scope['path'] == bench_stats_path:
+            payload = json.dumps(self.stats.snapshot(self.routes)).encode('UTF-8')
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode())]
+            })
+            await send({"type": "http.response.body", "body": payload})
+            return
+        start_bytes = self.stats.begin()
+        try:
+            await self.asgi_app(scope, receive, send)
+        finally:
+            self.stats.end(start_bytes)
+
+
+# route 경로를 비교 가능한 형태로 변환 : /keyword/<int:page>/<string:keyword_p> -> /keyword/{page}/{keyword_p}
+def normalize_route(path):
+    path = re.sub(r'<(?:[^:<>]+:)?([^<>]+)>', r'{\1}', path)
+    return re.sub(r'{([^:{}]+):[^{}]+}', r'{\1}', path)
+
+
+# Flask 에 등록된 route 목록
+def get_wsgi_routes():
+    routes = []
+    for rule in search_app.app.url_map.iter_rules():
+        if rule.endpoint == 'static':
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            routes.append([method, normalize_route(rule.rule)])
+    return routes
+
+
+# Starlette 에 등록된 route 목록
+def get_asgi_routes(asgi_app):
+    routes = []
+    for route in asgi_app.routes:
+        for method in sorted((route.methods or {'GET'}) - {'HEAD'}):
+            routes.append([method, normalize_route(route.path)])
+    return routes
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="search restapi benchmark server")
+    arg_parser.add_argument('--mode', choices=['wsgi', 'asgi'], default='wsgi')
+    arg_parser.add_argument('--port', type=int, default=5000)
+    arg_parser.add_argument('--es-url', required=True)
+    arg_parser.add_argument('--trace-alloc', action='store_true')
+    arg_parser.add_argument('--warm-up', action='store_true', help="run the worker warm-up before serving (wsgi)")
+    arg_parser.add_argument('--capture', help="capture every request to this JSONL file (wsgi, replay_traffic.py input)")
+    options = arg_parser.parse_args()
+    # Elasticsearch 접속정보를 대체 서버로 변경(SQL 변환은 Node 3개 중 1개를 선택하므로 같은 주소로 채움)
+    search_app.elasticsearch_server[:] = [options.es_url] * len(search_app.elasticsearch_server)
+    search_app.elasticsearch_sniff_on_connection_fail = False
+    bench_stats = BenchStats(options.trace_alloc)
+    if options.mode == 'wsgi':
+        from werkzeug.serving import make_server
+        # 요청 로그 출력은 측정에서 제외(asgi 의 access_log=False 와 동일)
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        if options.warm_up:
+            search_app.warm_up_worker()
+        if options.capture:
+            search_app.traffic_capture.filename = options.capture
+            search_app.traffic_capture.sample_rate = 1.0
+        search_app.app.wsgi_app = BenchWSGIMiddleware(search_app.app.wsgi_app, bench_stats, get_wsgi_routes())
+        server = make_server('127.0.0.1', options.port, search_app.app, threaded=True)
+        print("benchmark wsgi server : %d" % options.port, flush=True)
+        server.serve_forever()
+    else:
+        import uvicorn
+        import asgi
+        uvicorn.run(
+            BenchASGIMiddleware(asgi.app, bench_stats, get_asgi_routes(asgi.app)),
+            host='127.0.0.1', port=options.port, log_level='warning', access_log=False, lifespan='on'
+        )
@@ -0,0 +1,223 @@
+from io import BytesIO
+import os
+import queue
+import threading
+import time
+import pycurl
+
+# 연결 단계 오류 : 요청을 보내기 전에 실패했으므로 method 와 관계없이 재시도
+connect_error_codes = (
+    pycurl.E_COULDNT_RESOLVE_HOST,
+    pycurl.E_COULDNT_CONNECT,
+    pycurl.E_SSL_CONNECT_ERROR
+)
+# keep-alive 연결이 서버에서 종료된 경우(응답 없음, 송수신 오류) : 요청이 처리되었을 수 있으므로 조회 요청만 재시도
+# 처리시간 초과(timeout)는 요청이 처리되었을 수 있으므로 재시도하지 않음
+retry_error_codes = (
+    pycurl.E_GOT_NOTHING,
+    pycurl.E_SEND_ERROR,
+    pycurl.E_RECV_ERROR
+)
+# 여러 번 실행해도 결과가 같은 method(송수신 오류 시 재시도)
+idempotent_methods = ('GET', 'HEAD')
+
+
+# 재시도 가능한 오류 확인
+# :param err: pycurl.error
+# :param idempotent: 여러 번 실행해도 되는 요청인지 여부(False 이면 연결 단계 오류만 재시도)
+def is_retryable_error(err, idempotent):
+    code = err.args[0] if err.args else None
+    if code in connect_error_codes:
+        return True
+    return idempotent and code in retry_error_codes
+
+
+class CurlPool:
+    """
+    프로세스 별 pycurl handle pool
+    handle 을 재사용하여 keep-alive 연결을 유지하고, CurlShare 로 DNS cache, SSL session 을 handle 간에 공유
+    최대 handle 수까지만 생성하며 모두 사용중이면 반환될 때까지 대기
+    uWSGI 처럼 fork 하는 경우 pid 가 바뀌면 handle, CurlShare 를 다시 생성
+    """
+    def __init__(self, max_handles=10, connect_timeout=3, timeout=10, retries=1, retry_delay=0.05,
+                 verify=False, userpwd=None):
+        """
+        내부사용 변수 설정
+        :param max_handles: 최대 handle 수(동시 요청 수)
+        :param connect_timeout: 연결 제한시간(초)
+        :param timeout: 요청 제한시간(초), 0 이면 제한 없음
+        :param retries: 재시도 가능한 오류(is_retryable_error) 발생 시 재시도 횟수
+        :param retry_delay: 재시도 전 대기시간(초)
+        :param verify: SSL 인증서 확인 여부
+        :param userpwd: 기본 인증정보(user:password)
+        """
+        self.max_handles = max_handles
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.verify = verify
+        self.userpwd = userpwd
+        self.lock = threading.Lock()
+        self.pid = None
+        self.share = None
+        self.handles = None
+        self.slots = None
+        # 통계
+        self.requests = 0
+        self.new_connections = 0
+        self.retried = 0
+        self.errors = 0
+
+    def init_process(self):
+        """
+        현재 프로세스의 CurlShare, handle 대기열 생성(프로세스 별 1번)
+        :return:
+        """
+        pid = os.getpid()
+        if self.pid == pid:
+            return
+        with self.lock:
+            if self.pid == pid:
+                return
+            share = pycurl.CurlShare()
+            share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_DNS)
+            share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_SSL_SESSION)
+            self.share = share
+            self.handles = queue.LifoQueue()
+            self.slots = threading.BoundedSemaphore(self.max_handles)
+            self.pid = pid
+
+    def acquire(self):
+        """
+        handle 조회(최근에 사용한 handle 우선), 없으면 생성
+        :return: pycurl.Curl
+        """
+        self.init_process()
+        self.slots.acquire()
+        try:
+            return self.handles.get_nowait()
+        except queue.Empty:
+            handle = pycurl.Curl()
+            # reset 후에도 CurlShare 설정은 유지됨
+            handle.setopt(pycurl.SHARE, self.share)
+            return handle
+
+    def release(self, handle, reuse=True):
+        """
+        handle 반환, 오류가 발생한 handle 은 닫고 다음 요청에서 새로 생성
+        :param handle: pycurl.Curl
+        :param reuse: 재사용 여부
+        :return:
+        """
+        try:
+            if reuse:
+                self.handles.put_nowait(handle)
+            else:
+                handle.close()
+        finally:
+            self.slots.release()
+
+    def prepare(self, handle, method, url, body, headers, userpwd, timeout, buffer):
+        """
+        요청 설정 : reset 으로 이전 요청 설정을 지우고 연결(keep-alive), DNS, SSL session 은 유지
+        :return:
+        """
+        handle.reset()
+        handle.setopt(pycurl.URL, url)
+        handle.setopt(pycurl.NOSIGNAL, 1)
+        handle.setopt(pycurl.TCP_KEEPALIVE, 1)
+        handle.setopt(pycurl.CONNECTTIMEOUT, self.connect_timeout)
+        handle.setopt(pycurl.TIMEOUT, self.timeout if timeout is None else timeout)
+        if not self.verify:
+            handle.setopt(pycurl.SSL_VERIFYPEER, False)
+        if userpwd or self.userpwd:
+            handle.setopt(pycurl.USERPWD, userpwd or self.userpwd)
+        if headers:
+            handle.setopt(pycurl.HTTPHEADER, headers)
+        if method == 'GET':
+            handle.setopt(pycurl.HTTPGET, True)
+        elif method == 'POST':
+            handle.setopt(pycurl.POST, True)
+            handle.setopt(pycurl.POSTFIELDS, body or "")
+        else:
+            handle.setopt(pycurl.CUSTOMREQUEST, method)
+            if body is not None:
+                handle.setopt(pycurl.POSTFIELDS, body)
+        handle.setopt(pycurl.WRITEFUNCTION, buffer.write)
+
+    def request(self, method, url, body=None, headers=None, userpwd=None, timeout=None, retries=None,
+                idempotent=None):
+        """
+        요청 실행
+        :param method: HTTP method
+        :param url: 요청 URL
+        :param body: 요청 body(str)
+        :param headers: 요청 header 목록(['Content-type:application/json'])
+        :param userpwd: 인증정보(없으면 기본 인증정보)
+        :param timeout: 요청 제한시간(초, 없으면 기본 제한시간)
+        :param retries: 재시도 횟수(없으면 기본 재시도 횟수)
+        :param idempotent: 송수신 오류 시 재시도 여부(없으면 GET, HEAD 만 재시도, 조회용 POST 는 True 로 전달)
+        :return: HTTP status, 응답 body(str)
+        """
+        retries = self.retries if retries is None else retries
+        if idempotent is None:
+            idempotent = method in idempotent_methods
+        attempt = 0
+        while True:
+            handle = self.acquire()
+            buffer = BytesIO()
+            reuse = False
+            try:
+                self.prepare(handle, method, url, body, headers, userpwd, timeout, buffer)
+                handle.perform()
+                status = handle.getinfo(pycurl.RESPONSE_CODE)
+                connects = handle.getinfo(pycurl.NUM_CONNECTS)
+                reuse = True
+                with self.lock:
+                    self.requests += 1
+                    self.new_connections += connects
+                return status, buffer.getvalue().decode('UTF-8')
+            except pycurl.error as err:
+                if attempt < retries and is_retryable_error(err, idempotent):
+                    attempt += 1
+                    with self.lock:
+                        self.retried += 1
+                    time.sleep(self.retry_delay)
+                    continue
+                with self.lock:
+                    self.errors += 1
+                raise
+            finally:
+                buffer.close()
+                self.release(handle, reuse)
+
+    def stats(self):
+        """
+        pool 사용 현황
+        :return: 생성된 handle 수, 요청 수, 새 연결 수(나머지는 keep-alive 재사용), 재시도, 오류 수
+        """
+        with self.lock:
+            return {
+                "pid": self.pid,
+                "max_handles": self.max_handles,
+                "idle_handles": self.handles.qsize() if self.handles is not None else 0,
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": max(self.requests - self.new_connections, 0),
+                "retried": self.retried,
+                "errors": self.errors
+            }
+
+    def close(self):
+        """
+        모든 handle 정리(프로그램 종료 시)
+        :return:
+        """
+        if self.handles is None or self.pid != os.getpid():
+            return
+        while True:
+            try:
+                self.handles.get_nowait().close()
+            except queue.Empty:
+                break
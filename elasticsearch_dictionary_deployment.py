@@ -1,8 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from io import BytesIO
-from random import randint
+from urllib.parse import urlsplit
+from node_selector import NodeSelector
+from curl_pool import CurlPool, is_retryable_error, idempotent_methods
+import argparse
+import hashlib
 import json
+import os
 import pycurl
+import shlex
 import subprocess
 import traceback
 import time
@@ -23,6 +29,11 @@ class DictionaryDeployment:
             'https://elastic-02:9200',
             'https://elastic-03:9200'
         ]
+        # 응답시간, 오류율을 기준으로 Index 설정 변경 요청을 보낼 Node 선택
+        self.node_selector = NodeSelector(self.elasticsearch_server)
+        # pycurl handle pool : Node 별 keep-alive 연결, SSL session 재사용
+        # cluster health 대기 등 응답이 늦은 요청이 있으므로 요청 제한시간을 두지 않음
+        self.curl_pool = CurlPool(max_handles=4, timeout=0)
         # Elasticsearch Node 서버 계정
         self.server_id = "yourid"
         self.server_pw = "yourid!"
@@ -30,139 +41,489 @@ class DictionaryDeployment:
         self.nori_dictionary_path = "/home/yourid/anaconda3/envs/project/script/nori_dictionary"
         # Elasticsearch Node 서버 사전파일 위치
         self.node_server_dictionary_path = "/home/yourid/local/elasticsearch/config"
+        # 배포할 사전파일(사용자 정의 사전, 동의어 사전, 불용어 사전)
+        self.dictionary_files = [
+            "userdic_ko.txt",
+            "synonym.txt",
+            "stopwords.txt"
+        ]
+        # 사전파일 복사를 동시에 진행할 Node 수
+        self.copy_workers = 3
         # 적용할 Elasticsearch Index 목록
         self.index_alias = [
             "test-index-1",
             "test-index-2"
         ]
+        # 사전 적용 후 검색 결과 캐시를 무효화할 검색 API URL(None 이면 호출하지 않음)
+        self.search_api_url = None
+        # 사전 적용 방식
+        # reload : 검색 시점 analyzer(updateable: true 동의어 사전)만 _reload_search_analyzers 로 다시 읽음(Index 중단 없음)
+        # reindex : 새 Index 생성 후 _reindex, alias 를 새 Index 로 변경(Index 중단 없음, index_alias 가 alias 인 경우)
+        # update : Index close/open 후 _update_by_query(close ~ open 동안 검색 불가, alias 가 아닌 Index 에 사용)
+        # auto : 동의어 사전만 변경되었으면 reload, 그 외에는 reindex(마지막 적용 이후 변경된 사전이 없으면 적용하지 않음)
+        self.apply_mode = "auto"
+        # Index 별 마지막으로 적용한 사전파일 sha256 기록 파일
+        # 변경 여부는 복사 여부가 아니라 이 기록과 배포할 사전파일을 비교하여 판단(복사 후 적용에 실패한 경우 다음 실행에서 다시 적용)
+        self.applied_checksum_file = "/home/yourid/anaconda3/envs/project/script/nori_dictionary_applied.json"
+        # 변경된 사전이 없어도 모든 사전이 변경된 것으로 보고 적용(--force)
+        self.force = False
+        # 검색 시점에 다시 읽을 수 있는 사전(그 외 사전은 색인 시점 analyzer 에서 사용하므로 다시 색인 필요)
+        self.search_time_dictionary_files = ["synonym.txt"]
+        # _reindex, _update_by_query 설정 : slice 수, 초당 처리 건수 제한(-1 : 제한 없음), task 진행상황 확인 주기(초)
+        self.task_slices = "auto"
+        self.task_requests_per_second = 2000
+        self.task_poll_interval = 10
+        # alias 변경 후 이전 Index 삭제 여부(삭제하지 않으면 alias 를 되돌려 복구 가능)
+        self.delete_old_index = False
 
-    def call_elasticsearch_by_pycurl(self, url: str) -> str:
+    def call_elasticsearch_by_pycurl(self, url: str, method: str = 'POST', body: dict = None) -> str:
         """
         pyCurl 을 사용한 Elasticsearch 호출
         :param url: 호출 할 Elasticsearch URL
+        :param method: HTTP method
+        :param body: 요청 body(JSON 으로 변환), None 이면 파라메터 미설정
         :return: 응답결과 전달
         """
-        # StringIO 가 안되는 경우 BytesIO 를 사용
-        result = BytesIO()
-        conn = pycurl.Curl()
         try:
-            conn.setopt(pycurl.URL, url)
-            conn.setopt(pycurl.POST, True)
-            conn.setopt(pycurl.SSL_VERIFYPEER, False)
-            conn.setopt(pycurl.USERPWD, self.elasticsearch_userpw)
-            conn.setopt(pycurl.WRITEFUNCTION, result.write)
-            # 파라메터 미설정
-            conn.setopt(pycurl.POSTFIELDS, "")
-            conn.unsetopt(pycurl.HTTPHEADER)
-            # 실행
-            conn.perform()
-            res = result.getvalue().decode('UTF-8')
+            if body is None:
+                _, res = self.curl_pool.request(method, url, body="", userpwd=self.elasticsearch_userpw)
+            else:
+                _, res = self.curl_pool.request(
+                    method,
+                    url,
+                    body=json.dumps(body),
+                    headers=['Content-type:application/json'],
+                    userpwd=self.elasticsearch_userpw
+                )
         except pycurl.error as err:
             traceback.print_exc()
             raise err
         except Exception as err:
             traceback.print_exc()
             raise err
-        finally:
-            # 반드시 Close 할 것!!
-            result.close()
-            conn.close()
         return res
 
-    def call_copy_command(self, server_url, local_path, node_path):
+    def get_local_checksums(self):
+        """
+        배포할 사전파일의 sha256 값
+        :return: 파일명 -> sha256
+        """
+        checksums = {}
+        for file_name in self.dictionary_files:
+            digest = hashlib.sha256()
+            with open(os.path.join(self.nori_dictionary_path, file_name), 'rb') as dictionary_file:
+                for block in iter(lambda: dictionary_file.read(1024 * 1024), b''):
+                    digest.update(block)
+            checksums[file_name] = digest.hexdigest()
+        return checksums
+
+    def get_node_checksums(self, server_url):
+        """
+        ssh 로 Node 서버의 사전파일 sha256 값 조회(1번 접속으로 전체 파일 조회)
+        :param server_url: Elasticsearch Node Server Url
+        :return: 파일명 -> sha256, Node 서버에 없는 파일은 제외
+        """
+        host = urlsplit(server_url).hostname
+        remote_command = "cd %s && sha256sum %s" % (
+            shlex.quote(self.node_server_dictionary_path),
+            " ".join(shlex.quote(file_name) for file_name in self.dictionary_files)
+        )
+        ssh_command = "sshpass -p '%s' ssh -o StrictHostKeyChecking=no %s@%s %s" \
+                      % (self.server_pw, self.server_id, host, shlex.quote(remote_command))
+        result = subprocess.run(ssh_command, shell=True, stdout=subprocess.PIPE, universal_newlines=True)
+        # 없는 파일이 있으면 sha256sum 이 1 을 반환하므로 나머지 파일의 값은 사용하고, 접속 오류(255 등)만 실패 처리
+        if result.returncode not in (0, 1):
+            raise Exception("checksum failed[%s] : exit code %d" % (host, result.returncode))
+        checksums = {}
+        for line in result.stdout.splitlines():
+            checksum, _, file_name = line.strip().partition('  ')
+            if file_name in self.dictionary_files:
+                checksums[file_name] = checksum
+        return checksums
+
+    def call_copy_command(self, server_url, file_names):
         """
-        scp를 사용하여 서버에 파일 복사
+        scp를 사용하여 서버에 파일 복사(여러 파일을 1번 접속으로 복사)
         :param server_url: 복사 대상 서버
-        :param local_path: 복사 할 파일 경로
-        :param node_path: 복사 대상 파일 경로
+        :param file_names: 복사 할 사전파일 목록
         :return:
         """
         try:
-            print("%s copy start[%s] : %s -> %s" % (str(datetime.now()), server_url[8:-5], local_path, node_path))
-            copy_command = "sshpass -p '%s' scp -o StrictHostKeyChecking=no %s %s@%s:%s" \
-                           % (self.server_pw, local_path, self.server_id, server_url[8:-5], node_path)
+            host = urlsplit(server_url).hostname
+            print("%s copy start[%s] : %s" % (str(datetime.now()), host, ", ".join(file_names)))
+            copy_command = "sshpass -p '%s' scp -o StrictHostKeyChecking=no %s %s@%s:%s/" % (
+                self.server_pw,
+                " ".join(shlex.quote(os.path.join(self.nori_dictionary_path, file_name)) for file_name in file_names),
+                self.server_id,
+                host,
+                shlex.quote(self.node_server_dictionary_path)
+            )
             subprocess.check_call(copy_command, shell=True)
-            print("%s copy end[%s] : %s -> %s" % (str(datetime.now()), server_url[8:-5], local_path, node_path))
+            print("%s copy end[%s] : %s" % (str(datetime.now()), host, ", ".join(file_names)))
         except Exception as err:
             traceback.print_exc()
             raise err
 
-    def dictionary_copy_to_elasticsearch_node(self, server_url):
+    def dictionary_copy_to_elasticsearch_node(self, server_url, local_checksums):
         """
-        사용자정의 사전, 동의어 사전 파일을 각 노드 서버에 복사
+        사용자정의 사전, 동의어 사전 파일 중 변경된 파일만 노드 서버에 복사 후 sha256 값으로 확인
         :param server_url: Elasticsearch Node Server Url
-        :return:
+        :param local_checksums: 배포할 사전파일의 sha256 값(get_local_checksums)
+        :return: 복사한 파일 목록
         """
-        try:
-            # 사용자 정의 사전 복사
-            userdic_ko_local_path = self.nori_dictionary_path + "/userdic_ko.txt"
-            userdic_ko_node_path = self.node_server_dictionary_path + "/userdic_ko.txt"
-            self.call_copy_command(server_url, userdic_ko_local_path, userdic_ko_node_path)
-            # 동의어 사전 복사
-            synonym_local_path = self.nori_dictionary_path + "/synonym.txt"
-            synonym_node_path = self.node_server_dictionary_path + "/synonym.txt"
-            self.call_copy_command(server_url, synonym_local_path, synonym_node_path)
-            # 불용어 사전 복사
-            stopwords_local_path = self.nori_dictionary_path + "/stopwords.txt"
-            stopwords_node_path = self.node_server_dictionary_path + "/stopwords.txt"
-            self.call_copy_command(server_url, stopwords_local_path, stopwords_node_path)
-        except Exception as err:
-            raise err
+        host = urlsplit(server_url).hostname
+        node_checksums = self.get_node_checksums(server_url)
+        changed = [
+            file_name for file_name in self.dictionary_files
+            if node_checksums.get(file_name) != local_checksums[file_name]
+        ]
+        if not changed:
+            print("%s copy skip[%s] : no changes" % (str(datetime.now()), host))
+            return changed
+        self.call_copy_command(server_url, changed)
+        node_checksums = self.get_node_checksums(server_url)
+        mismatched = [file_name for file_name in changed if node_checksums.get(file_name) != local_checksums[file_name]]
+        if mismatched:
+            raise Exception("copy verify failed[%s] : %s" % (host, ", ".join(mismatched)))
+        return changed
 
-    def call_endpoint_url(self, endpoint_url):
+    def copy_dictionary_to_nodes(self, local_checksums=None):
+        """
+        각 노드 서버에 변경된 사전파일을 동시에 복사(copy_workers 개 Node 씩)
+        일부 Node 에서 실패한 경우 나머지 Node 의 복사가 끝난 뒤 실패한 Node 목록으로 오류 발생
+        :param local_checksums: 배포할 사전파일의 sha256 값, None 이면 계산
+        :return: Node 별 복사한 파일 목록
+        """
+        if local_checksums is None:
+            local_checksums = self.get_local_checksums()
+        with ThreadPoolExecutor(max_workers=max(min(self.copy_workers, len(self.elasticsearch_server)), 1)) as pool:
+            futures = {
+                server_url: pool.submit(self.dictionary_copy_to_elasticsearch_node, server_url, local_checksums)
+                for server_url in self.elasticsearch_server
+            }
+        copied = {}
+        errors = []
+        for server_url, future in futures.items():
+            try:
+                copied[server_url] = future.result()
+            except Exception as err:
+                errors.append("%s(%s)" % (urlsplit(server_url).hostname, err))
+        if errors:
+            raise Exception("dictionary copy failed : " + ", ".join(errors))
+        return copied
+
+    def call_endpoint_url(self, endpoint_url, method='POST', body=None, verbose=True):
         """
         endpoint url 호출 후 결과 확인
         :param endpoint_url: 요청할 endpoint url
-        :return:
+        :param method: HTTP method
+        :param body: 요청 body
+        :param verbose: 시작, 종료 출력 여부(task 진행상황 확인 등 반복 호출은 출력하지 않음)
+        :return: 응답결과(JSON)
         """
         try:
-            print("%s %s start" % (str(datetime.now()), endpoint_url))
-            res = self.call_elasticsearch_by_pycurl(endpoint_url)
+            if verbose:
+                print("%s %s %s start" % (str(datetime.now()), method, endpoint_url))
+            res = self.call_elasticsearch_by_pycurl(endpoint_url, method, body)
             result_json = json.loads(res)
-            if "error" in result_json and result_json["error"]:
+            if isinstance(result_json, dict) and "error" in result_json and result_json["error"]:
                 # 오류 발생 시 Exception 생성
                 print(res)
-                msg = result_json["error"]["type"] + ":" + result_json["error"]["reason"]
+                error = result_json["error"]
+                if isinstance(error, dict):
+                    msg = error["type"] + ":" + error["reason"]
+                else:
+                    msg = str(error)
                 raise Exception(msg)
             else:
                 # 정상 처리
-                print("%s %s end" % (str(datetime.now()), endpoint_url))
+                if verbose:
+                    print("%s %s %s end" % (str(datetime.now()), method, endpoint_url))
+            return result_json
         except Exception as err:
             raise err
 
-    def apply_dictionary(self, index_name):
+    def call_node_endpoint(self, endpoint_path, method='POST', body=None, verbose=True):
+        """
+        응답이 빠른 정상 Node 를 선택하여 endpoint 호출, 연결 오류 시 다른 Node 로 재시도
+        (GET 이 아닌 요청은 전송 전 연결 단계 오류만 재시도하여 같은 요청이 여러 번 실행되지 않도록 함)
+        :param endpoint_path: 요청할 endpoint 경로(/index/_close 등)
+        :param method: HTTP method
+        :param body: 요청 body
+        :param verbose: 시작, 종료 출력 여부
+        :return: 응답결과(JSON)
+        """
+        return self.node_selector.call(
+            lambda server_url: self.call_endpoint_url(server_url + endpoint_path, method, body, verbose),
+            attempts=len(self.elasticsearch_server),
+            errors=(pycurl.error,),
+            retryable=lambda err: is_retryable_error(err, method in idempotent_methods)
+        )
+
+    def load_applied_checksums(self):
+        """
+        Index 별 마지막으로 적용한 사전파일 sha256 조회
+        :return: Index -> (파일명 -> sha256), 기록이 없으면 빈 dict
+        """
+        try:
+            with open(self.applied_checksum_file, encoding='UTF-8') as applied_file:
+                return json.load(applied_file)
+        except FileNotFoundError:
+            return {}
+
+    def save_applied_checksums(self, index_name, local_checksums):
+        """
+        Index 에 적용한 사전파일 sha256 기록(적용이 끝난 뒤 호출)
+        :param index_name: 적용한 Index Name
+        :param local_checksums: 적용한 사전파일의 sha256 값
+        :return:
+        """
+        applied = self.load_applied_checksums()
+        applied[index_name] = local_checksums
+        temp_file = self.applied_checksum_file + ".tmp"
+        with open(temp_file, 'w', encoding='UTF-8') as applied_file:
+            json.dump(applied, applied_file, indent=2, sort_keys=True)
+        os.replace(temp_file, self.applied_checksum_file)
+
+    def get_pending_files(self, index_name, local_checksums, applied):
+        """
+        Index 에 아직 적용하지 않은 사전파일 목록
+        :param index_name: 적용할 Index Name
+        :param local_checksums: 배포할 사전파일의 sha256 값
+        :param applied: Index 별 마지막으로 적용한 사전파일 sha256(load_applied_checksums)
+        :return: 적용할 사전파일 목록, 적용 기록이 없으면 None(알 수 없음)
+        """
+        if self.force:
+            return list(self.dictionary_files)
+        if index_name not in applied:
+            return None
+        return [
+            file_name for file_name in self.dictionary_files
+            if applied[index_name].get(file_name) != local_checksums[file_name]
+        ]
+
+    def select_apply_mode(self, changed_files):
+        """
+        사전 적용 방식 선택
+        :param changed_files: 적용하지 않은 사전파일 목록(get_pending_files 결과), None 이면 알 수 없음
+        :return: reload, reindex, update, 적용하지 않으면 None
+        """
+        if self.apply_mode != "auto":
+            return self.apply_mode
+        if changed_files is None:
+            return "reindex"
+        if not changed_files:
+            return None
+        if set(changed_files) <= set(self.search_time_dictionary_files):
+            return "reload"
+        return "reindex"
+
+    def get_alias_index(self, alias):
+        """
+        alias 가 가리키는 Index 조회
+        :param alias: index_alias 의 이름
+        :return: Index Name, alias 가 아니거나(Index 이름) 여러 Index 를 가리키면 None
+        """
+        res = self.call_node_endpoint("/%s/_alias" % alias, method='GET', verbose=False)
+        indices = list(res)
+        if len(indices) != 1 or indices[0] == alias:
+            return None
+        return indices[0]
+
+    def reload_search_analyzers(self, index_name):
+        """
+        검색 시점 analyzer 의 사전을 다시 읽고 request cache 정리(Index close/open 없음)
+        :param index_name: 적용할 Index Name
+        :return: True : 다시 읽은 analyzer 있음, False : updateable analyzer 가 없어 다시 읽지 않음
+        """
+        res = self.call_node_endpoint("/%s/_reload_search_analyzers" % index_name)
+        reloaded = [
+            analyzer for detail in res.get("reload_details", []) for analyzer in detail.get("reloaded_analyzers", [])
+        ]
+        if not reloaded:
+            return False
+        print("%s reloaded analyzers[%s] : %s" % (str(datetime.now()), index_name, ", ".join(sorted(set(reloaded)))))
+        # 이전 analyzer 로 검색한 결과가 shard request cache 에 남지 않도록 정리
+        self.call_node_endpoint("/%s/_cache/clear?request=true" % index_name)
+        return True
+
+    def wait_for_task(self, task_id):
+        """
+        wait_for_completion=false 로 시작한 task 의 진행상황을 주기적으로 출력하고 완료될 때까지 대기
+        :param task_id: task id(node_id:task_number)
+        :return: task 결과(response)
+        """
+        started = time.monotonic()
+        while True:
+            res = self.call_node_endpoint("/_tasks/%s" % task_id, method='GET', verbose=False)
+            status = res.get("task", {}).get("status", {})
+            total = status.get("total", 0)
+            done = sum(status.get(key, 0) for key in ("created", "updated", "deleted", "noops"))
+            elapsed = time.monotonic() - started
+            rate = done / elapsed if elapsed > 0 else 0
+            print("%s task %s : %d/%d (%.1f%%), %.0f docs/s, conflicts %d%s" % (
+                str(datetime.now()), task_id, done, total, done * 100.0 / total if total else 100.0, rate,
+                status.get("version_conflicts", 0),
+                ", eta %ds" % ((total - done) / rate) if rate > 0 and total > done else ""
+            ))
+            if res.get("completed"):
+                if res.get("error"):
+                    raise Exception("task %s failed : %s" % (task_id, res["error"].get("reason")))
+                response = res.get("response", {})
+                if response.get("failures"):
+                    raise Exception("task %s failed : %s" % (task_id, json.dumps(response["failures"][:3])))
+                return response
+            time.sleep(self.task_poll_interval)
+
+    def get_task_params(self):
+        """
+        _reindex, _update_by_query 의 공통 요청 파라메터(비동기 실행, slice, 초당 처리 건수 제한)
+        :return: URL 파라메터 문자열
+        """
+        return "wait_for_completion=false&slices=%s&requests_per_second=%s" \
+               % (self.task_slices, self.task_requests_per_second)
+
+    def make_reindex_target(self, source_index):
+        """
+        새 Index 설정 : 기존 Index 의 settings, mappings 사용(Elasticsearch 가 생성하는 값 제외)
+        다시 색인하는 동안은 replica 없이 refresh 하지 않도록 설정하고, 완료 후 기존 값으로 변경
+        :param source_index: 기존 Index Name
+        :return: 새 Index 생성 body, 완료 후 적용할 settings
+        """
+        settings = self.call_node_endpoint("/%s/_settings" % source_index, method='GET', verbose=False)
+        index_settings = settings[source_index]["settings"]["index"]
+        for key in ("uuid", "creation_date", "provided_name", "version", "resize", "verified_before_close"):
+            index_settings.pop(key, None)
+        mappings = self.call_node_endpoint("/%s/_mapping" % source_index, method='GET', verbose=False)
+        restore_settings = {
+            "number_of_replicas": index_settings.get("number_of_replicas", "1"),
+            "refresh_interval": index_settings.get("refresh_interval")
+        }
+        index_settings["number_of_replicas"] = "0"
+        index_settings["refresh_interval"] = "-1"
+        return {
+            "settings": {"index": index_settings},
+            "mappings": mappings[source_index]["mappings"]
+        }, restore_settings
+
+    def reindex_with_alias_swap(self, alias, source_index):
+        """
+        새 Index 를 만들어 다시 색인한 뒤 alias 를 한 번에 새 Index 로 변경(검색은 계속 기존 Index 사용)
+        다시 색인하는 동안 기존 Index 에 추가된 문서는 새 Index 에 반영되지 않으므로 색인 작업을 멈춘 상태에서 실행
+        :param alias: index_alias 의 이름
+        :param source_index: alias 가 가리키는 Index
+        :return:
+        """
+        target_index = "%s-%s" % (alias, datetime.now().strftime("%Y%m%d%H%M%S"))
+        target_body, restore_settings = self.make_reindex_target(source_index)
+        self.call_node_endpoint("/%s" % target_index, method='PUT', body=target_body)
+        res = self.call_node_endpoint("/_reindex?%s" % self.get_task_params(), body={
+            "source": {"index": source_index},
+            "dest": {"index": target_index}
+        })
+        self.wait_for_task(res["task"])
+        self.call_node_endpoint("/%s/_settings" % target_index, method='PUT', body={"index": restore_settings})
+        self.call_node_endpoint("/%s/_refresh" % target_index)
+        health = self.call_node_endpoint(
+            "/_cluster/health/%s?wait_for_status=green&timeout=10m" % target_index, method='GET')
+        if health.get("timed_out"):
+            print("%s %s replicas are not ready yet(status %s)" % (str(datetime.now()), target_index, health["status"]))
+        source_count = self.call_node_endpoint("/%s/_count" % source_index, method='GET', verbose=False)["count"]
+        target_count = self.call_node_endpoint("/%s/_count" % target_index, method='GET', verbose=False)["count"]
+        if source_count != target_count:
+            raise Exception("reindex count mismatch : %s %d, %s %d"
+                            % (source_index, source_count, target_index, target_count))
+        # alias 변경(제거, 추가를 1번의 요청으로 처리하여 alias 가 없는 시점이 없음)
+        self.call_node_endpoint("/_aliases", body={"actions": [
+            {"remove": {"index": source_index, "alias": alias}},
+            {"add": {"index": target_index, "alias": alias}}
+        ]})
+        print("%s alias %s : %s -> %s" % (str(datetime.now()), alias, source_index, target_index))
+        if self.delete_old_index:
+            self.call_node_endpoint("/%s" % source_index, method='DELETE')
+
+    def reopen_and_update_by_query(self, index_name):
+        """
+        Index close/open 으로 색인 시점 analyzer 를 다시 읽고 전체 문서를 다시 색인(close ~ open 동안 검색 불가)
+        :param index_name: 적용할 Index Name
+        :return:
+        """
+        # Index close
+        self.call_node_endpoint("/%s/_close" % index_name)
+        # Index open : primary shard 가 할당될 때까지 대기
+        self.call_node_endpoint("/%s/_open?wait_for_active_shards=1" % index_name)
+        self.call_node_endpoint("/_cluster/health/%s?wait_for_status=yellow&timeout=5m" % index_name, method='GET')
+        # Index update
+        res = self.call_node_endpoint(
+            "/%s/_update_by_query?conflicts=proceed&%s" % (index_name, self.get_task_params()))
+        self.wait_for_task(res["task"])
+
+    def apply_dictionary(self, index_name, changed_files=None):
         """
         사전 파일 배포 후 각 Index 재설정
+        reload 로 다시 읽을 analyzer 가 없으면 reindex, alias 가 아닌 Index 는 update 방식으로 적용
         :param index_name: 적용할 Index Name
+        :param changed_files: 적용하지 않은 사전파일 목록
         :return:
         """
         try:
-            server_url = self.elasticsearch_server[randint(0, 2)]
-            # Index close
-            endpoint_url = "%s/%s/_close" % (server_url, index_name)
-            self.call_endpoint_url(endpoint_url)
-            # Index open
-            endpoint_url = "%s/%s/_open" % (server_url, index_name)
-            self.call_endpoint_url(endpoint_url)
-            # Index update
-            time.sleep(1)  # open 후 1초 정도 기다려야 정상 동작함
-            endpoint_url = "%s/%s/_update_by_query" % (server_url, index_name)
-            self.call_endpoint_url(endpoint_url)
+            apply_mode = self.select_apply_mode(changed_files)
+            if apply_mode is None:
+                print("%s %s skip : no dictionary changes" % (str(datetime.now()), index_name))
+                return
+            if apply_mode == "reload":
+                if self.reload_search_analyzers(index_name):
+                    return
+                print("%s %s : no updateable analyzer, reindex" % (str(datetime.now()), index_name))
+                apply_mode = "reindex"
+            if apply_mode == "reindex":
+                source_index = self.get_alias_index(index_name)
+                if source_index is not None:
+                    self.reindex_with_alias_swap(index_name, source_index)
+                    return
+                print("%s %s is not an alias, close/open and update" % (str(datetime.now()), index_name))
+            self.reopen_and_update_by_query(index_name)
         except Exception as err:
             raise err
 
+    def invalidate_search_cache(self, index_name):
+        """
+        검색 API 의 Index 검색 결과 캐시 무효화
+        :param index_name: 무효화할 Index Name
+        :return:
+        """
+        if self.search_api_url is None:
+            return
+        try:
+            url = "%s/cache/%s" % (self.search_api_url, index_name)
+            print("%s %s cache invalidate" % (str(datetime.now()), url))
+            self.curl_pool.request('DELETE', url, timeout=10)
+        except Exception:
+            # 캐시는 TTL 이후 자동으로 만료되므로 배포를 중단하지 않음
+            traceback.print_exc()
+
     def deploy_dictionary(self):
         """
         변경된 사전들을 Elasticsearch Node 서버들에 적용
         :return:
         """
         try:
-            # 서버에 파일 복제
-            for server_url in self.elasticsearch_server:
-                self.dictionary_copy_to_elasticsearch_node(server_url)
-            # 현재 사용중인 Index에 적용
+            # 서버에 변경된 파일 복제
+            started = time.monotonic()
+            local_checksums = self.get_local_checksums()
+            copied = self.copy_dictionary_to_nodes(local_checksums)
+            print("%s copy done : %d files, %.1fs" % (
+                str(datetime.now()),
+                sum(len(file_names) for file_names in copied.values()),
+                time.monotonic() - started
+            ))
+            # 현재 사용중인 Index에 적용(auto 방식이면 마지막 적용 이후 변경된 사전에 따라 적용 방식 선택)
+            applied = self.load_applied_checksums()
             for index_name in self.index_alias:
-                self.apply_dictionary(index_name)
+                changed_files = self.get_pending_files(index_name, local_checksums, applied)
+                self.apply_dictionary(index_name, changed_files)
+                self.save_applied_checksums(index_name, local_checksums)
+                self.invalidate_search_cache(index_name)
         except Exception as err:
             print("%s DEPLOY ERROR : %s" % (str(datetime.now()), err))
 
@@ -171,6 +532,11 @@ if __name__ == '__main__':
     """
     실행 명령어 :
     /home/yourid/anaconda3/envs/project/bin/python /home/yourid/anaconda3/envs/project/script/elasticsearch_dictionary_deployment.py
+    변경 여부와 관계없이 다시 적용 : 위 명령어 뒤에 --force 추가
     """
+    arg_parser = argparse.ArgumentParser(description="nori dictionary deployment")
+    arg_parser.add_argument('--force', action='store_true', help="apply dictionaries even if nothing changed")
+    options = arg_parser.parse_args()
     deploy = DictionaryDeployment()
+    deploy.force = options.force
     deploy.deploy_dictionary()
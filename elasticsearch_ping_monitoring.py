@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from io import BytesIO
+from curl_pool import CurlPool
 import json
 import pycurl
 import os
@@ -30,6 +30,9 @@ class ElasticsearchPing:
         ]
         self.server_id = "yourid"
         self.server_pw = "yourid!"
+        # pycurl handle pool : 반복 확인 시 keep-alive 연결, SSL session 재사용
+        # 서버 상태를 그대로 보여주기 위해 재시도하지 않음
+        self.curl_pool = CurlPool(max_handles=len(self.elasticsearch_server), timeout=5, retries=0)
         self.ansi_formatters = {
             # ANSI Controll 문자
             "CEND": "\033[0m",
@@ -81,28 +84,14 @@ class ElasticsearchPing:
         :param url: 호출 할 Elasticsearch URL
         :return: 응답결과 전달
         """
-        # StringIO 가 안되는 경우 BytesIO 를 사용
-        result = BytesIO()
-        conn = pycurl.Curl()
         try:
-            conn.setopt(pycurl.URL, url)
-            conn.setopt(pycurl.HTTPGET, True)
-            conn.setopt(pycurl.SSL_VERIFYPEER, False)
-            conn.setopt(pycurl.USERPWD, self.elasticsearch_userpw)
-            conn.setopt(pycurl.WRITEFUNCTION, result.write)
-            # 실행
-            conn.perform()
-            res = result.getvalue().decode('UTF-8')
+            _, res = self.curl_pool.request('GET', url, userpwd=self.elasticsearch_userpw)
         except pycurl.error as err:
             traceback.print_exc()
             raise err
         except Exception as err:
             traceback.print_exc()
             raise err
-        finally:
-            # 반드시 Close 할 것!!
-            result.close()
-            conn.close()
         return res
 
     def check_ping_result(self, result: str) -> str:
@@ -0,0 +1,274 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+import bisect
+import json
+import threading
+import time
+from search_cache import UwsgiCacheBackend, uwsgi
+
+# 응답시간 histogram 구간(초)
+default_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 지표 이름 별 형식, 설명(Prometheus text format 의 TYPE, HELP)
+metric_info = {
+    "search_api_request_seconds": ("histogram", "API request wall time by route, method and status."),
+    "search_api_stage_seconds": (
+        "histogram",
+        "Time spent per stage : parse_build, sql_translate, es_wall, es_took, shaping, serialize."
+    ),
+    "search_api_errors_total": ("counter", "Error responses by route and type."),
+    "search_api_scroll_opens_total": ("counter", "Scroll contexts opened by route."),
+    "search_api_cache_hits_total": ("counter", "Search cache hits by route."),
+    "search_api_cache_misses_total": ("counter", "Search cache misses by route."),
+    "search_api_slow_queries_total": ("counter", "Elasticsearch calls written to the slow query log by route."),
+    "search_api_response_bytes_total": ("counter", "Response body bytes sent by route and content encoding."),
+    "search_api_egress_saved_bytes_total": (
+        "counter",
+        "Response body bytes not sent by route and reason : compression, not_modified."
+    ),
+    "search_api_count_reused_total": (
+        "counter",
+        "Searches that skipped total hit counting by route and source of the reused count : cursor, cache."
+    )
+}
+
+# 요청 처리 중인 route(thread, asyncio task 별로 유지)
+current_route = ContextVar('metrics_route', default='none')
+
+
+# Prometheus label 값 escape
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Prometheus label 문자열
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join('%s="%s"' % (key, escape_label(value)) for key, value in labels) + "}"
+
+
+class SearchMetrics:
+    """
+    route 별 응답시간 histogram, 단계별 처리시간 histogram, counter
+    worker 별로 집계하고 uWSGI 실행 시에는 주기적으로 uWSGI cache 에 저장하여 /metrics 조회 시 전체 worker 를 합산
+    """
+    def __init__(self, buckets=default_buckets, shared_cache_name=None, publish_interval=1.0):
+        """
+        내부사용 변수 설정
+        :param buckets: histogram 구간(초)
+        :param shared_cache_name: worker 별 집계를 저장할 uWSGI cache name, None 이면 현재 worker 만 조회
+        :param publish_interval: uWSGI cache 저장 주기(초)
+        """
+        self.buckets = tuple(buckets)
+        # (이름, label) -> [구간별 건수, 합계, 건수]
+        self.histograms = {}
+        # (이름, label) -> 값
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.shared = None
+        if shared_cache_name is not None and uwsgi is not None:
+            self.shared = UwsgiCacheBackend(shared_cache_name)
+        self.publish_interval = publish_interval
+        self.last_publish = 0
+        self.dirty = False
+
+    def set_route(self, route):
+        """
+        현재 요청의 route 설정(요청 시작 시 호출)
+        :param route: route 규칙(/keyword/<int:page>/<string:keyword_p>)
+        :return:
+        """
+        current_route.set(route)
+
+    def get_route(self):
+        """
+        현재 요청의 route 조회
+        :return: route 규칙, 요청 처리 중이 아니면 none
+        """
+        return current_route.get()
+
+    def make_labels(self, labels):
+        """
+        route 를 포함한 label 생성
+        :param labels: 추가 label
+        :return: 정렬된 (이름, 값) tuple
+        """
+        labels.setdefault('route', current_route.get())
+        return tuple(sorted(labels.items()))
+
+    def observe(self, name, seconds, **labels):
+        """
+        histogram 에 처리시간 기록
+        :param name: 지표 이름
+        :param seconds: 처리시간(초)
+        :param labels: 추가 label(route 는 현재 요청의 route)
+        :return:
+        """
+        key = (name, self.make_labels(labels))
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+            self.dirty = True
+
+    def count(self, name, value=1, **labels):
+        """
+        counter 증가
+        :param name: 지표 이름
+        :param value: 증가값
+        :param labels: 추가 label(route 는 현재 요청의 route)
+        :return:
+        """
+        key = (name, self.make_labels(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            self.dirty = True
+
+    def observe_stage(self, stage, seconds):
+        """
+        단계별 처리시간 기록
+        :param stage: parse_build, sql_translate, es_wall, es_took, shaping, serialize
+        :param seconds: 처리시간(초)
+        :return:
+        """
+        self.observe('search_api_stage_seconds', seconds, stage=stage)
+
+    def observe_es(self, started, response):
+        """
+        Elasticsearch 호출 시간 기록 : 호출 전체 시간(es_wall)과 응답의 took(es_took)
+        took 과 es_wall 의 차이는 네트워크, 직렬화, connection 대기 시간
+        :param started: 호출 시작 시간(perf_counter)
+        :param response: Elasticsearch 응답
+        :return:
+        """
+        self.observe_stage('es_wall', time.perf_counter() - started)
+        if isinstance(response, dict) and isinstance(response.get('took'), (int, float)):
+            self.observe_stage('es_took', response['took'] / 1000.0)
+
+    @contextmanager
+    def stage_timer(self, stage):
+        """
+        with 구문으로 단계별 처리시간 기록
+        :param stage: 단계 이름
+        :return:
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - started)
+
+    def timed(self, stage):
+        """
+        함수 처리시간을 단계별 처리시간으로 기록하는 decorator
+        :param stage: 단계 이름
+        :return: decorator
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage_timer(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """
+        현재 worker 의 집계
+        :return: JSON 변환 가능한 집계
+        """
+        with self.lock:
+            return {
+                "histograms": [
+                    [name, labels, list(value[0]), value[1], value[2]]
+                    for (name, labels), value in self.histograms.items()
+                ],
+                "counters": [[name, labels, value] for (name, labels), value in self.counters.items()]
+            }
+
+    def worker_key(self, worker_id):
+        """
+        worker 별 집계 저장 key
+        :param worker_id: uWSGI worker id
+        :return: key
+        """
+        return "metrics:worker:%d" % worker_id
+
+    def publish(self, force=False):
+        """
+        현재 worker 의 집계를 uWSGI cache 에 저장(저장 주기가 지나고 변경된 경우만)
+        :param force: 저장 주기와 관계없이 저장
+        :return:
+        """
+        if self.shared is None or not self.dirty:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_publish < self.publish_interval:
+            return
+        self.last_publish = now
+        self.dirty = False
+        data = json.dumps(self.snapshot(), separators=(',', ':')).encode('UTF-8')
+        # worker 가 다시 시작되면 같은 worker id 로 덮어씀
+        self.shared.set(self.worker_key(uwsgi.worker_id()), data, 86400)
+
+    def collect(self):
+        """
+        전체 worker 집계 합산(현재 worker 는 저장하지 않은 최신 값 사용)
+        :return: (이름, label) 별 histogram, counter
+        """
+        snapshots = [self.snapshot()]
+        if self.shared is not None:
+            self.publish(force=True)
+            current_worker = uwsgi.worker_id()
+            for worker_id in range(1, uwsgi.numproc + 1):
+                if worker_id == current_worker:
+                    continue
+                data = self.shared.get(self.worker_key(worker_id))
+                if data:
+                    snapshots.append(json.loads(data))
+        histograms = {}
+        counters = {}
+        for snapshot in snapshots:
+            for name, labels, bucket_counts, total, count in snapshot['histograms']:
+                key = (name, tuple(tuple(label) for label in labels))
+                merged = histograms.setdefault(key, [[0] * len(bucket_counts), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], bucket_counts)]
+                merged[1] += total
+                merged[2] += count
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(tuple(label) for label in labels))
+                counters[key] = counters.get(key, 0) + value
+        return histograms, counters
+
+    def render(self):
+        """
+        Prometheus text format 변환
+        :return: /metrics 응답 문자열
+        """
+        histograms, counters = self.collect()
+        lines = []
+        for name, (metric_type, help_text) in metric_info.items():
+            lines.append("# HELP %s %s" % (name, help_text))
+            lines.append("# TYPE %s %s" % (name, metric_type))
+            if metric_type == 'histogram':
+                for (metric_name, labels), (bucket_counts, total, count) in sorted(histograms.items()):
+                    if metric_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, bucket_count in zip(self.buckets + (float('inf'),), bucket_counts):
+                        cumulative += bucket_count
+                        le = "+Inf" if bound == float('inf') else repr(bound)
+                        lines.append("%s_bucket%s %d" % (name, format_labels(labels + (('le', le),)), cumulative))
+                    lines.append("%s_sum%s %.6f" % (name, format_labels(labels), total))
+                    lines.append("%s_count%s %d" % (name, format_labels(labels), count))
+            else:
+                for (metric_name, labels), value in sorted(counters.items()):
+                    if metric_name == name:
+                        lines.append("%s%s %d" % (name, format_labels(labels), value))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,206 @@
+import random
+import threading
+import time
+
+
+class NodeState:
+    """
+    Node 1개의 응답시간, 오류율, 제외(eject) 상태
+    """
+    def __init__(self):
+        """
+        내부사용 변수 설정
+        """
+        # 응답시간 EWMA(초), 요청이 없었던 Node 는 None(가장 먼저 사용)
+        self.latency = None
+        # 오류율 EWMA(0 ~ 1)
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        # 제외된 경우 다시 확인(probe)할 시간(monotonic), 제외 횟수
+        self.ejected_until = None
+        self.ejections = 0
+        self.probing = False
+        # 통계
+        self.requests = 0
+        self.failures = 0
+
+
+class NodeSelector:
+    """
+    응답시간과 오류율을 기준으로 Elasticsearch Node 선택
+    응답시간(EWMA)이 가장 짧은 정상 Node 를 사용하고, 연속 오류 또는 오류율이 기준을 넘은 Node 는
+    backoff 시간 동안 제외한 뒤 요청 1건으로 다시 확인(probe)하여 복구 여부를 판단
+    Node 목록은 설정(list)을 그대로 참조하므로 Node 수와 관계없이 사용 가능
+    """
+    def __init__(self, nodes, alpha=0.3, eject_failures=3, max_error_rate=0.5,
+                 base_backoff=5.0, max_backoff=300.0, error_penalty=4.0, explore_rate=0.05):
+        """
+        내부사용 변수 설정
+        :param nodes: Node URL 목록(설정 list)
+        :param alpha: EWMA 가중치(최근 요청 반영 비율)
+        :param eject_failures: 제외할 연속 오류 수
+        :param max_error_rate: 제외할 오류율(EWMA)
+        :param base_backoff: 첫 제외 시간(초), 다시 제외될 때마다 2배(max_backoff 까지)
+        :param max_backoff: 최대 제외 시간(초)
+        :param error_penalty: 오류율에 따른 응답시간 가중치(점수 = 응답시간 * (1 + 오류율 * error_penalty))
+        :param explore_rate: 응답시간, 오류율 갱신을 위해 다른 정상 Node 를 사용하는 비율
+        """
+        self.nodes = nodes
+        self.alpha = alpha
+        self.eject_failures = eject_failures
+        self.max_error_rate = max_error_rate
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.error_penalty = error_penalty
+        self.explore_rate = explore_rate
+        self.states = {}
+        self.lock = threading.Lock()
+
+    def get_state(self, node):
+        """
+        Node 상태 조회(lock 을 잡은 상태에서 호출)
+        :param node: Node URL
+        :return: NodeState
+        """
+        state = self.states.get(node)
+        if state is None:
+            state = self.states[node] = NodeState()
+        return state
+
+    def score(self, state):
+        """
+        Node 선택 점수(작을수록 우선)
+        :param state: NodeState
+        :return: 점수
+        """
+        if state.latency is None:
+            return 0.0
+        return state.latency * (1 + state.error_rate * self.error_penalty)
+
+    def select(self, exclude=()):
+        """
+        요청할 Node 선택
+        제외 시간이 지난 Node 가 있으면 확인 요청으로 먼저 사용하고,
+        모든 Node 가 제외된 경우에는 다시 확인할 시간이 가장 가까운 Node 사용
+        :param exclude: 이번 요청에서 이미 실패한 Node
+        :return: Node URL
+        """
+        now = time.monotonic()
+        with self.lock:
+            candidates = [node for node in self.nodes if node not in exclude] or list(self.nodes)
+            healthy = []
+            for node in candidates:
+                state = self.get_state(node)
+                if state.ejected_until is None:
+                    healthy.append((self.score(state), random.random(), node))
+                elif state.ejected_until <= now and not state.probing:
+                    state.probing = True
+                    return node
+            if len(healthy) > 1 and random.random() < self.explore_rate:
+                return random.choice(healthy)[2]
+            if healthy:
+                return min(healthy)[2]
+            return min(candidates, key=lambda item: self.get_state(item).ejected_until)
+
+    def report(self, node, elapsed, success):
+        """
+        요청 결과 반영
+        :param node: Node URL
+        :param elapsed: 응답시간(초)
+        :param success: 성공 여부(연결 실패, timeout 등 Node 문제인 경우 False)
+        :return:
+        """
+        with self.lock:
+            state = self.get_state(node)
+            state.requests += 1
+            state.probing = False
+            state.error_rate += self.alpha * ((0.0 if success else 1.0) - state.error_rate)
+            if success:
+                if state.latency is None:
+                    state.latency = elapsed
+                else:
+                    state.latency += self.alpha * (elapsed - state.latency)
+                state.consecutive_failures = 0
+                if state.ejected_until is not None:
+                    # 확인 요청 성공 : 복구, 오류율은 기준 이하로 낮춰서 다시 제외되지 않도록 함
+                    state.ejected_until = None
+                    state.ejections = 0
+                    state.error_rate = min(state.error_rate, self.max_error_rate / 2)
+                return
+            state.failures += 1
+            state.consecutive_failures += 1
+            if state.ejected_until is not None or state.consecutive_failures >= self.eject_failures \
+                    or state.error_rate >= self.max_error_rate:
+                backoff = min(self.base_backoff * (2 ** state.ejections), self.max_backoff)
+                state.ejections += 1
+                state.ejected_until = time.monotonic() + backoff
+
+    def call(self, func, attempts=2, errors=(Exception,), retryable=None):
+        """
+        Node 를 선택하여 func(node) 실행, errors 에 해당하는 오류 중 retryable 이 True 인 경우 다른 Node 로 재시도
+        :param func: Node URL 을 받아 요청하는 함수
+        :param attempts: 최대 시도 횟수
+        :param errors: Node 오류로 판단할 Exception
+        :param retryable: 다른 Node 로 다시 보내도 되는 오류인지 확인하는 함수(err -> bool), 없으면 재시도하지 않음
+        (timeout, 전송 후 오류는 요청이 처리되었을 수 있으므로 조회 요청이 아니면 재시도하지 않도록 전달)
+        :return: func 결과
+        """
+        tried = []
+        while True:
+            node = self.select(exclude=tried)
+            started = time.monotonic()
+            reported = False
+            try:
+                result = func(node)
+            except errors as err:
+                self.report(node, time.monotonic() - started, False)
+                reported = True
+                tried.append(node)
+                if retryable is None or not retryable(err) or len(tried) >= attempts:
+                    raise
+                continue
+            except Exception:
+                # Node 문제가 아닌 오류는 응답을 받은 것으로 처리
+                self.report(node, time.monotonic() - started, True)
+                reported = True
+                raise
+            else:
+                self.report(node, time.monotonic() - started, True)
+                reported = True
+                return result
+            finally:
+                if not reported:
+                    # 결과를 반영하지 못한 경우(BaseException) 확인 요청 상태가 남지 않도록 해제
+                    self.release_probe(node)
+
+    def release_probe(self, node):
+        """
+        확인(probe) 요청 상태 해제 : 제외 시간이 지났으므로 다음 요청에서 다시 확인
+        :param node: Node URL
+        :return:
+        """
+        with self.lock:
+            self.get_state(node).probing = False
+
+    def stats(self):
+        """
+        Node 별 상태
+        :return: Node 별 응답시간, 오류율, 제외 여부
+        """
+        now = time.monotonic()
+        with self.lock:
+            nodes = []
+            for node in self.nodes:
+                state = self.get_state(node)
+                nodes.append({
+                    "node": node.split('@')[-1],
+                    "latency_ms": round(state.latency * 1000, 3) if state.latency is not None else None,
+                    "error_rate": round(state.error_rate, 4),
+                    "ejected": state.ejected_until is not None,
+                    "retry_in": round(max(state.ejected_until - now, 0), 1) if state.ejected_until else None,
+                    "requests": state.requests,
+                    "failures": state.failures
+                })
+            return {
+                "nodes": nodes
+            }
@@ -0,0 +1,132 @@
+import gzip
+import hashlib
+import zlib
+
+try:
+    # brotli 가 설치된 경우에만 br 압축 사용
+    import brotli
+except ImportError:
+    brotli = None
+
+# 압축 대상 content type(이미지 등 압축된 형식은 제외)
+compressible_types = ('application/json', 'application/x-ndjson', 'text/')
+
+
+# Accept-Encoding 에서 사용할 압축 방식 선택(br, gzip 순서), 압축하지 않으면 None
+def choose_encoding(accept_encoding):
+    accepted = {}
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', accepted.get('*', 0)) > 0:
+        return 'gzip'
+    return None
+
+
+# 압축 대상 content type 확인
+def is_compressible(content_type):
+    return bool(content_type) and content_type.startswith(compressible_types)
+
+
+# 응답 body 로 ETag 생성(압축한 응답은 압축 방식을 붙여 다른 ETag 사용)
+def make_etag(data, encoding=None):
+    etag = hashlib.sha1(data).hexdigest()
+    if encoding:
+        etag += '-' + encoding
+    return etag
+
+
+# If-None-Match 에 ETag 가 포함되어 있는지 확인(W/ 는 무시)
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    for item in if_none_match.split(','):
+        item = item.strip()
+        if item == '*':
+            return True
+        if item.startswith('W/'):
+            item = item[2:]
+        if item.strip('"') == etag:
+            return True
+    return False
+
+
+# 응답 body 전체 압축
+def compress_body(data, encoding, level=5):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level)
+
+
+class StreamCompressor:
+    """
+    스트리밍 응답 압축 : 전달받은 부분을 바로 압축하여 반환(부분마다 flush 하여 클라이언트가 기다리지 않도록 함)
+    """
+    def __init__(self, encoding, level=5):
+        """
+        내부사용 변수 설정
+        :param encoding: gzip, br
+        :param level: 압축 수준
+        """
+        self.encoding = encoding
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(quality=level)
+        else:
+            # wbits 31 : gzip header 사용
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        # 통계
+        self.raw_bytes = 0
+        self.encoded_bytes = 0
+
+    def compress(self, data):
+        """
+        부분 압축
+        :param data: 응답 body 일부(bytes)
+        :return: 압축된 bytes
+        """
+        self.raw_bytes += len(data)
+        if self.encoding == 'br':
+            result = self.compressor.process(data) + self.compressor.flush()
+        else:
+            result = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.encoded_bytes += len(result)
+        return result
+
+    def finish(self):
+        """
+        압축 종료
+        :return: 남은 압축 bytes
+        """
+        if self.encoding == 'br':
+            result = self.compressor.finish()
+        else:
+            result = self.compressor.flush()
+        self.encoded_bytes += len(result)
+        return result
+
+
+# 스트리밍 응답 압축 : 응답 body 의 부분별로 압축하여 전달, 종료 시 on_finish(원본 크기, 압축 크기) 호출
+def compress_stream(chunks, encoding, level=5, on_finish=None):
+    compressor = StreamCompressor(encoding, level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('UTF-8')
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        if on_finish is not None:
+            on_finish(compressor.raw_bytes, compressor.encoded_bytes)
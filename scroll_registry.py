@@ -0,0 +1,248 @@
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+from search_cache import UwsgiCacheBackend, uwsgi
+
+
+class ScrollRegistry:
+    """
+    API 에서 발급한 scroll_id 관리
+    클라이언트 별 최대 개수, 전체 최대 개수를 기준으로 정리할 scroll_id 를 반환
+    Elasticsearch 호출(clear_scroll)은 동기/비동기 모드에서 각각 처리하도록 호출한 쪽에서 수행
+    uWSGI 실행 시 scroll_id 별 사용 정보와 worker 별 목록을 uWSGI cache 에 저장하여 worker 간에 공유
+    (다른 worker 에서 다음 페이지를 조회한 scroll 은 정리하지 않고, 최대 개수는 전체 worker 기준으로 확인)
+    """
+    def __init__(self, max_per_client=5, max_total=500, keep_alive=60, reap_interval=10, shared_cache_name=None):
+        """
+        내부사용 변수 설정
+        :param max_per_client: 클라이언트 별 최대 scroll 수(초과 시 가장 오래된 scroll 정리)
+        :param max_total: 최대 scroll 수(초과 시 새 scroll 거부)
+        :param keep_alive: Elasticsearch scroll 유지시간(초), 마지막 사용 후 이 시간이 지난 scroll 은 목록에서 제외
+        :param reap_interval: 만료된 scroll 확인 주기(초)
+        :param shared_cache_name: worker 간 공유할 uWSGI cache name, None 이면 프로세스 내에서만 사용
+        (gunicorn 등 여러 프로세스로 실행하면서 공유 cache 가 없으면 최대 개수는 프로세스 별로 적용)
+        """
+        self.max_per_client = max_per_client
+        self.max_total = max_total
+        self.keep_alive = keep_alive
+        self.reap_interval = reap_interval
+        # scroll_id -> (client_id, 마지막 사용시간), 마지막 사용 순서로 정렬
+        self.scrolls = OrderedDict()
+        self.last_reap = time.time()
+        self.lock = threading.Lock()
+        self.shared = None
+        if shared_cache_name is not None and uwsgi is not None:
+            self.shared = UwsgiCacheBackend(shared_cache_name)
+        # 통계
+        self.opened = 0
+        self.cleared_empty = 0
+        self.cleared_client = 0
+        self.expired = 0
+        self.evicted = 0
+        self.rejected = 0
+
+    def is_full(self):
+        """
+        새 scroll 을 열 수 있는지 확인
+        :return: True : 최대 개수 초과
+        """
+        with self.lock:
+            total = len(self.scrolls)
+            if self.shared is not None:
+                total += sum(len(scrolls) for scrolls in self.other_workers().values())
+            full = total >= self.max_total
+            if full:
+                self.rejected += 1
+            return full
+
+    def register(self, client_id, scroll_id):
+        """
+        새로 발급한 scroll_id 등록
+        :param client_id: 요청 클라이언트
+        :param scroll_id: 발급한 scroll_id
+        :return: 정리할 scroll_id 목록
+        """
+        now = time.time()
+        with self.lock:
+            self.collect_expired(now)
+            self.store(client_id, scroll_id, now)
+            self.opened += 1
+            # scroll_id -> 마지막 사용시간(다른 worker 로 이동한 scroll 은 목록 갱신 전까지 중복될 수 있음)
+            client_scrolls = {key: value[1] for key, value in self.scrolls.items() if value[0] == client_id}
+            if self.shared is not None:
+                for scrolls in self.other_workers().values():
+                    for key, owner, last_used in scrolls:
+                        if owner == client_id and self.is_live(key):
+                            client_scrolls[key] = max(last_used, client_scrolls.get(key, 0))
+            ordered = sorted(client_scrolls, key=client_scrolls.get)
+            evicted = ordered[:-self.max_per_client]
+            for old_scroll_id in evicted:
+                self.forget(old_scroll_id)
+            self.evicted += len(evicted)
+            self.publish()
+        return evicted
+
+    def touch(self, client_id, scroll_id, next_scroll_id):
+        """
+        다음 페이지 조회 시 사용시간 갱신, 다른 worker 에서 발급한 scroll_id 는 현재 worker 로 이동
+        :param client_id: 요청 클라이언트
+        :param scroll_id: 요청한 scroll_id
+        :param next_scroll_id: 응답의 scroll_id
+        :return:
+        """
+        now = time.time()
+        with self.lock:
+            self.collect_expired(now)
+            if next_scroll_id != scroll_id:
+                self.forget(scroll_id)
+            self.store(client_id, next_scroll_id, now)
+            self.publish()
+
+    def release(self, scroll_id, reason='client'):
+        """
+        마지막 페이지 조회 또는 클라이언트 요청으로 scroll_id 정리
+        :param scroll_id: 정리할 scroll_id
+        :param reason: 정리 사유(empty : 마지막 페이지, client : 클라이언트 요청)
+        :return:
+        """
+        with self.lock:
+            self.forget(scroll_id)
+            if reason == 'empty':
+                self.cleared_empty += 1
+            else:
+                self.cleared_client += 1
+            self.publish()
+
+    def store(self, client_id, scroll_id, now):
+        """
+        scroll_id 사용 정보 저장(lock 을 잡은 상태에서 호출)
+        :param client_id: 요청 클라이언트
+        :param scroll_id: 사용한 scroll_id
+        :param now: 현재 시간
+        :return:
+        """
+        self.scrolls[scroll_id] = (client_id, now)
+        self.scrolls.move_to_end(scroll_id)
+        if self.shared is not None:
+            value = json.dumps({"client": client_id, "worker": uwsgi.worker_id()}).encode('UTF-8')
+            self.shared.set(self.scroll_key(scroll_id), value, self.keep_alive)
+
+    def forget(self, scroll_id):
+        """
+        scroll_id 를 목록에서 제외(lock 을 잡은 상태에서 호출)
+        :param scroll_id: 제외할 scroll_id
+        :return:
+        """
+        self.scrolls.pop(scroll_id, None)
+        if self.shared is not None:
+            self.shared.delete(self.scroll_key(scroll_id))
+
+    def collect_expired(self, now):
+        """
+        목록 정리(lock 을 잡은 상태에서 호출)
+        유지시간이 지난 scroll 은 Elasticsearch 에서 이미 만료되었으므로 clear_scroll 없이 목록에서만 제외
+        공유 cache 사용 시 다른 worker 가 정리했거나 다음 페이지를 조회한 scroll 도 제외
+        :param now: 현재 시간
+        :return:
+        """
+        if now - self.last_reap < self.reap_interval:
+            return
+        self.last_reap = now
+        for scroll_id, (client_id, last_used) in list(self.scrolls.items()):
+            if now - last_used >= self.keep_alive:
+                del self.scrolls[scroll_id]
+                self.expired += 1
+            elif self.shared is not None and not self.is_owned(scroll_id):
+                del self.scrolls[scroll_id]
+
+    @staticmethod
+    def scroll_key(scroll_id):
+        """
+        scroll_id 별 사용 정보 저장 key(scroll_id 는 길이가 길어 hash 사용)
+        :param scroll_id: scroll_id
+        :return: key
+        """
+        return "scroll:id:%s" % hashlib.sha1(scroll_id.encode('UTF-8')).hexdigest()
+
+    @staticmethod
+    def worker_key(worker_id):
+        """
+        worker 별 scroll 목록 저장 key
+        :param worker_id: uWSGI worker id
+        :return: key
+        """
+        return "scroll:worker:%d" % worker_id
+
+    def is_live(self, scroll_id):
+        """
+        유지시간 내에 사용된 scroll 인지 확인(공유 cache 사용 시)
+        :param scroll_id: scroll_id
+        :return: True : 사용중
+        """
+        return self.shared.exists(self.scroll_key(scroll_id))
+
+    def is_owned(self, scroll_id):
+        """
+        현재 worker 에서 마지막으로 사용한 scroll 인지 확인(공유 cache 사용 시)
+        :param scroll_id: scroll_id
+        :return: True : 현재 worker 에서 관리
+        """
+        value = self.shared.get(self.scroll_key(scroll_id))
+        if value is None:
+            return False
+        return json.loads(value).get('worker') == uwsgi.worker_id()
+
+    def publish(self):
+        """
+        현재 worker 의 scroll 목록을 공유 cache 에 저장(lock 을 잡은 상태에서 호출)
+        :return:
+        """
+        if self.shared is None:
+            return
+        data = [[key, value[0], value[1]] for key, value in self.scrolls.items()]
+        # worker 가 다시 시작되면 같은 worker id 로 덮어씀
+        self.shared.set(self.worker_key(uwsgi.worker_id()), json.dumps(data).encode('UTF-8'), 86400)
+
+    def other_workers(self):
+        """
+        다른 worker 의 scroll 목록 조회(공유 cache 사용 시)
+        :return: worker id -> [scroll_id, client_id, 마지막 사용시간] 목록
+        """
+        current_worker = uwsgi.worker_id()
+        now = time.time()
+        workers = {}
+        for worker_id in range(1, uwsgi.numproc + 1):
+            if worker_id == current_worker:
+                continue
+            data = self.shared.get(self.worker_key(worker_id))
+            if data:
+                # 요청이 없는 worker 의 목록은 갱신되지 않으므로 유지시간이 지난 scroll 은 제외
+                workers[worker_id] = [scroll for scroll in json.loads(data) if now - scroll[2] < self.keep_alive]
+        return workers
+
+    def stats(self):
+        """
+        scroll 현황
+        :return: 현재 열린 scroll 수(gauge) 및 누적 통계
+        """
+        with self.lock:
+            scrolls = {key: value[0] for key, value in self.scrolls.items()}
+            if self.shared is not None:
+                for worker_scrolls in self.other_workers().values():
+                    scrolls.update((key, owner) for key, owner, last_used in worker_scrolls)
+            return {
+                "shared": self.shared is not None,
+                "open_scrolls": len(scrolls),
+                "worker_scrolls": len(self.scrolls),
+                "clients": len(set(scrolls.values())),
+                "max_per_client": self.max_per_client,
+                "max_total": self.max_total,
+                "opened": self.opened,
+                "cleared_empty": self.cleared_empty,
+                "cleared_client": self.cleared_client,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "rejected": self.rejected
+            }
@@ -0,0 +1,283 @@
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+
+try:
+    # uWSGI 로 실행 시에만 사용 가능
+    import uwsgi
+except ImportError:
+    uwsgi = None
+
+
+class UwsgiCacheBackend:
+    """
+    uWSGI caching framework 를 사용한 worker 간 공유 캐시
+    search_restapi.ini 의 cache2 설정으로 생성된 cache 를 사용
+    """
+    def __init__(self, cache_name):
+        """
+        내부사용 변수 설정
+        :param cache_name: search_restapi.ini 에 설정한 cache2 name
+        """
+        self.cache_name = cache_name
+
+    def get(self, key):
+        """
+        공유 캐시 조회
+        :param key: 캐시 key
+        :return: 저장된 bytes, 없으면 None
+        """
+        try:
+            return uwsgi.cache_get(key, self.cache_name)
+        except Exception:
+            return None
+
+    def set(self, key, value, ttl):
+        """
+        공유 캐시 저장(blocksize 를 넘는 값은 저장되지 않음)
+        :param key: 캐시 key
+        :param value: 저장할 bytes
+        :param ttl: 유효시간(초)
+        :return:
+        """
+        try:
+            uwsgi.cache_update(key, value, max(int(ttl), 1), self.cache_name)
+        except Exception:
+            pass
+
+    def add(self, key, value, ttl):
+        """
+        key 가 없는 경우에만 저장(다른 worker 와의 lock 용도)
+        :param key: 캐시 key
+        :param value: 저장할 bytes
+        :param ttl: 유효시간(초)
+        :return: True : 저장 성공, False : 이미 존재
+        """
+        try:
+            return bool(uwsgi.cache_set(key, value, max(int(ttl), 1), self.cache_name))
+        except Exception:
+            return False
+
+    def exists(self, key):
+        """
+        key 존재 여부 확인
+        :param key: 캐시 key
+        :return: True : 존재
+        """
+        try:
+            return bool(uwsgi.cache_exists(key, self.cache_name))
+        except Exception:
+            return False
+
+    def increment(self, key, ttl):
+        """
+        정수 값 1 증가(uWSGI lock 을 잡고 조회, 저장하여 worker 간 동시 증가 시에도 누락되지 않음)
+        :param key: 캐시 key
+        :param ttl: 유효시간(초)
+        :return: 증가된 값, 실패 시 None
+        """
+        try:
+            uwsgi.lock()
+        except Exception:
+            return None
+        try:
+            value = uwsgi.cache_get(key, self.cache_name)
+            value = (int(value) if value else 0) + 1
+            uwsgi.cache_update(key, str(value).encode('UTF-8'), max(int(ttl), 1), self.cache_name)
+            return value
+        except Exception:
+            return None
+        finally:
+            uwsgi.unlock()
+
+    def delete(self, key):
+        """
+        공유 캐시 삭제
+        :param key: 캐시 key
+        :return:
+        """
+        try:
+            uwsgi.cache_del(key, self.cache_name)
+        except Exception:
+            pass
+
+
+class SearchCache:
+    """
+    검색 결과 캐시(TTL + LRU)
+    Query DSL 을 정렬된 JSON 으로 변환한 값으로 key 를 생성하여 같은 조건의 요청은 같은 결과를 사용
+    Index 별, 전체 generation 값을 key 에 포함하여 generation 변경으로 무효화 처리
+    """
+    def __init__(self, max_entries=1000, max_bytes=32 * 1024 * 1024, shared_cache_name=None):
+        """
+        내부사용 변수 설정
+        :param max_entries: 최대 저장 건수
+        :param max_bytes: 최대 저장 크기(JSON 변환 기준)
+        :param shared_cache_name: worker 간 공유할 uWSGI cache name, None 이면 프로세스 내에서만 사용
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.generations = {}
+        self.lock = threading.Lock()
+        self.shared = None
+        if shared_cache_name is not None and uwsgi is not None:
+            self.shared = UwsgiCacheBackend(shared_cache_name)
+        # 통계
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(index, body):
+        """
+        Query DSL 로 캐시 key 생성
+        :param index: 조회 Index
+        :param body: Query DSL
+        :return: key 문자열
+        """
+        canonical = json.dumps(body, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha1(("%s|%s" % (index, canonical)).encode('UTF-8')).hexdigest()
+
+    def get_generation(self, index):
+        """
+        Index 의 현재 generation 조회
+        :param index: 조회 Index, '*' 는 전체 generation
+        :return: generation
+        """
+        if self.shared is not None:
+            value = self.shared.get("gen:%s" % index)
+            return int(value) if value else 0
+        return self.generations.get(index, 0)
+
+    def make_full_key(self, index, key):
+        """
+        Index, generation 을 포함한 실제 저장 key 생성
+        :param index: 조회 Index
+        :param key: make_key 로 생성한 key
+        :return: 저장 key
+        """
+        return "%s:%d:%d:%s" % (index, self.get_generation('*'), self.get_generation(index), key)
+
+    def get(self, index, key):
+        """
+        캐시 조회
+        :param index: 조회 Index
+        :param key: make_key 로 생성한 key
+        :return: 저장된 검색 결과, 없으면 None
+        """
+        full_key = self.make_full_key(index, key)
+        with self.lock:
+            entry = self.entries.get(full_key)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self.entries.move_to_end(full_key)
+                    self.hits += 1
+                    return entry[3]
+                self.remove(full_key)
+                self.expirations += 1
+        if self.shared is not None:
+            value = self.shared.get(full_key)
+            if value is not None:
+                shared_entry = json.loads(value)
+                if shared_entry["expire"] > time.time():
+                    self.store(full_key, index, shared_entry["value"], shared_entry["expire"], len(value))
+                    with self.lock:
+                        self.shared_hits += 1
+                    return shared_entry["value"]
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def set(self, index, key, value, ttl):
+        """
+        캐시 저장
+        :param index: 조회 Index
+        :param key: make_key 로 생성한 key
+        :param value: 검색 결과
+        :param ttl: 유효시간(초)
+        :return:
+        """
+        full_key = self.make_full_key(index, key)
+        expire = time.time() + ttl
+        data = json.dumps({"expire": expire, "value": value}, ensure_ascii=False).encode('UTF-8')
+        self.store(full_key, index, value, expire, len(data))
+        if self.shared is not None:
+            self.shared.set(full_key, data, ttl)
+
+    def store(self, full_key, index, value, expire, size):
+        """
+        프로세스 내 캐시에 저장 후 제한을 넘으면 오래 사용되지 않은 순서로 삭제
+        :param full_key: 저장 key
+        :param index: 조회 Index
+        :param value: 검색 결과
+        :param expire: 만료시간(epoch)
+        :param size: 저장 크기
+        :return:
+        """
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if full_key in self.entries:
+                self.remove(full_key)
+            self.entries[full_key] = (expire, size, index, value)
+            self.total_bytes += size
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                old_key = next(iter(self.entries))
+                self.remove(old_key)
+                self.evictions += 1
+
+    def remove(self, full_key):
+        """
+        프로세스 내 캐시 삭제(lock 을 잡은 상태에서 호출)
+        :param full_key: 저장 key
+        :return:
+        """
+        entry = self.entries.pop(full_key)
+        self.total_bytes -= entry[1]
+
+    def invalidate(self, index=None):
+        """
+        Index 단위 캐시 무효화, 공유 캐시는 generation 을 올려 다른 worker 의 캐시도 무효화
+        :param index: 무효화할 Index, None 이면 전체
+        :return: 삭제된 프로세스 내 캐시 건수
+        """
+        target_index = '*' if index is None else index
+        with self.lock:
+            if index is None:
+                targets = list(self.entries)
+            else:
+                targets = [key for key, entry in self.entries.items() if entry[2] == index]
+            for full_key in targets:
+                self.remove(full_key)
+            self.generations[target_index] = self.generations.get(target_index, 0) + 1
+            self.invalidations += 1
+        if self.shared is not None:
+            self.shared.increment("gen:%s" % target_index, 86400 * 365)
+        return len(targets)
+
+    def stats(self):
+        """
+        캐시 통계
+        :return: hit/miss/eviction 등 통계
+        """
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "shared": self.shared is not None,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,66 @@
+import base64
+import binascii
+import json
+
+# 커서 방식 페이징 설정
+# point in time 유지시간(다음 페이지 요청까지 허용 시간)
+cursor_keep_alive = '1m'
+# 정렬값이 같은 문서의 순서를 고정하기 위한 tiebreaker(Elasticsearch 7.12 미만은 goods_id 등 유일한 필드로 변경)
+cursor_tiebreaker = {"_shard_doc": "asc"}
+# 커서로 요청 가능한 최대 페이지 크기
+cursor_max_size = 1000
+
+
+# 커서 정보를 클라이언트에 전달할 문자열로 변환
+def encode_cursor(state):
+    data = json.dumps(state, separators=(',', ':'), ensure_ascii=False).encode('UTF-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+# 클라이언트가 전달한 커서 문자열 확인, 잘못된 커서는 None 반환
+def decode_cursor(cursor):
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        state = json.loads(data.decode('UTF-8'))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(state, dict) or 'pit' not in state or 'after' not in state:
+        return None
+    if not isinstance(state.get('page'), int) or not isinstance(state.get('size'), int):
+        return None
+    if state['page'] < 1 or state['size'] < 1 or state['size'] > cursor_max_size:
+        return None
+    return state
+
+
+# Query DSL 에 point in time, search_after 적용
+# point in time 사용 시 Index 는 지정하지 않으며 search_after 가 있으면 from 은 0 으로 조회
+def apply_point_in_time(body, pit_id, search_after):
+    body['pit'] = {
+        "id": pit_id,
+        "keep_alive": cursor_keep_alive
+    }
+    sort = body.get('sort') or []
+    if not sort:
+        # 정렬조건이 없으면 기존과 같이 score 순서로 정렬
+        sort = ["_score"]
+    body['sort'] = sort + [cursor_tiebreaker]
+    if search_after is not None:
+        body['from'] = 0
+        body['search_after'] = search_after
+    return body
+
+
+# 다음 페이지 커서 생성, 마지막 페이지이면 None 반환
+# total 은 첫 페이지에서 계산한 전체 건수(다음 페이지는 전체 건수를 다시 계산하지 않음)
+def make_next_cursor(response, page, size, total=None):
+    res_list = response.get('hits', {}).get('hits', [])
+    if len(res_list) < size:
+        return None
+    return encode_cursor({
+        "pit": response['pit_id'],
+        "after": res_list[-1]['sort'],
+        "page": page + 1,
+        "size": size,
+        "total": total
+    })
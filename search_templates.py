@@ -0,0 +1,114 @@
+# Elasticsearch Stored Search Template
+# make_search_condition 으로 생성하는 Query DSL 과 같은 조건을 mustache template 으로 등록하여
+# 요청 시에는 template id 와 파라메터만 전달
+# template 이 이미 등록되어 있으면 덮어쓰지 않으므로 Elasticsearch 에서 직접 수정하면 배포 없이 조건 변경 가능
+
+# 검색 조건 Query(query_type 별)
+search_template_queries = {
+    "keyword": """{
+        "match": {
+            "goodsname_nm": {
+                "query": "{{keyword}}",
+                "fuzziness": "AUTO"
+            }
+        }
+    }""",
+    "text": """{
+        "match_phrase": {
+            "goodsname_nm": {
+                "query": "{{keyword}}",
+                "slop": 5
+            }
+        }
+    }""",
+    "multi": """{
+        "multi_match": {
+            "query": "{{keyword}}",
+            "fields": [
+                "goodsname_nm^3",
+                "content",
+                "description"
+            ],
+            "fuzziness": "AUTO"
+        }
+    }"""
+}
+
+# 공통 template : Filter 조건은 파라메터가 있는 경우에만 추가(match_all 뒤에 이어서 추가)
+# track_total_hits : true(정확한 건수), false(계산하지 않음), 숫자(해당 건수까지만 계산)
+search_template_source = """{
+    "from": {{from}},
+    "size": {{size}},
+    "track_total_hits": {{track_total_hits}},
+    "query": {
+        "bool": {
+            "must": [
+                %s
+            ],
+            "filter": [
+                {"match_all": {}}
+                {{#best_yn}},{"term": {"best_yn.keyword": "{{best_yn}}"}}{{/best_yn}}
+                {{#new_yn}},{"term": {"new_yn.keyword": "{{new_yn}}"}}{{/new_yn}}
+                {{#reg_date}},{"range": {"reg_date": {"gte": "{{reg_date}}"}}}{{/reg_date}}
+                {{#view_cnt}},{"range": {"view_cnt": {"gte": "{{view_cnt}}"}}}{{/view_cnt}}
+            ]
+        }
+    },
+    "sort": [
+        {{#s_reg_date}}{"reg_date": {"order": "{{s_reg_date}}"}}{{/s_reg_date}}
+    ],
+    "_source": [
+        "group_nm",
+        "goodsname_nm",
+        "goods_id",
+        "cate1_code",
+        "cate2_code",
+        "content",
+        "description",
+        "best_yn",
+        "new_yn",
+        "user_id",
+        "reg_date"
+    ]
+}"""
+
+# template id(query 형태를 변경하는 경우 버전을 올려서 등록)
+search_template_ids = {
+    "keyword": "search-restapi-keyword-v2",
+    "text": "search-restapi-text-v2",
+    "multi": "search-restapi-multi-v2"
+}
+
+# template 파라메터로 전달하는 Filter 조건
+search_template_filters = ['best_yn', 'new_yn', 'reg_date', 'view_cnt', 's_reg_date']
+
+
+# 등록되지 않은 template 만 등록
+def register_search_templates(client):
+    for query_type, template_id in search_template_ids.items():
+        res = client.get_script(id=template_id, ignore=404)
+        if res.get('found'):
+            continue
+        client.put_script(id=template_id, body={
+            "script": {
+                "lang": "mustache",
+                "source": search_template_source % search_template_queries[query_type]
+            }
+        })
+
+
+# search_template 요청 body 생성
+def make_template_body(query_type, from_num, size, keyword_p, args, track_total_hits=True):
+    params = {
+        "from": from_num,
+        "size": size,
+        "keyword": keyword_p,
+        "track_total_hits": track_total_hits
+    }
+    for name in search_template_filters:
+        if name in args and args[name]:
+            params[name] = args[name]
+    return {
+        "id": search_template_ids[query_type],
+        "params": params
+    }
@@ -0,0 +1,227 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from search_cache import UwsgiCacheBackend, uwsgi
+
+
+class SingleFlightCall:
+    """
+    진행중인 조회 1건(대기하는 요청은 event 로 결과를 전달받음)
+    """
+    def __init__(self):
+        """
+        내부사용 변수 설정
+        """
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    같은 조건의 조회가 동시에 요청되면 1번만 Elasticsearch 를 호출하고 결과를 대기중인 요청에 전달
+    worker 내 thread 간에는 event 로, uWSGI worker 간에는 uWSGI cache 의 lock/결과 key 로 공유
+    """
+    def __init__(self, shared_cache_name=None, shared_wait=2.0, shared_poll=0.01, shared_result_ttl=1):
+        """
+        내부사용 변수 설정
+        :param shared_cache_name: worker 간 공유할 uWSGI cache name, None 이면 worker 내에서만 사용
+        :param shared_wait: 다른 worker 의 조회 결과를 기다리는 최대 시간(초), 초과 시 직접 조회
+        :param shared_poll: 다른 worker 의 조회 결과 확인 간격(초)
+        :param shared_result_ttl: 다른 worker 에 전달할 결과 유지시간(초)
+        (결과 key 는 조회 1건의 token 을 포함하므로 조회가 끝난 뒤의 요청에는 사용되지 않음)
+        """
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.shared = None
+        if shared_cache_name is not None and uwsgi is not None:
+            self.shared = UwsgiCacheBackend(shared_cache_name)
+        self.shared_wait = shared_wait
+        self.shared_poll = shared_poll
+        self.shared_result_ttl = shared_result_ttl
+        self.tokens = itertools.count(1)
+        # 통계
+        self.leaders = 0
+        self.coalesced = 0
+        self.shared_leaders = 0
+        self.shared_coalesced = 0
+        self.shared_timeouts = 0
+
+    def do(self, key, func):
+        """
+        key 가 같은 조회가 진행중이면 결과를 기다리고, 없으면 func 를 호출
+        :param key: 조회 조건 key(Index + Query DSL)
+        :param func: 조회 함수
+        :return: 조회 결과(같은 key 의 요청은 같은 객체를 공유하므로 변경하지 않고 사용)
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = SingleFlightCall()
+                self.calls[key] = call
+                self.leaders += 1
+                leader = True
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            if self.shared is not None:
+                call.result = self.do_shared(key, func)
+            else:
+                call.result = func()
+        except BaseException as err:
+            # 대기중인 요청이 결과 없이(None) 반환되지 않도록 모든 오류를 전달
+            call.error = err
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+        return call.result
+
+    def do_shared(self, key, func):
+        """
+        uWSGI worker 간 조회 공유 : lock 을 잡은 worker 만 조회하고 나머지는 결과 key 를 확인
+        lock 에 조회 1건의 token 을 저장하고 결과 key 에 token 을 포함하여, 진행중인 조회를 기다린 요청만 결과를 사용
+        :param key: 조회 조건 key
+        :param func: 조회 함수
+        :return: 조회 결과
+        """
+        lock_key = "sf:lock:%s" % key
+        token = "%d.%d" % (os.getpid(), next(self.tokens))
+        if self.shared.add(lock_key, token.encode('UTF-8'), self.shared_wait + 1):
+            self.count_shared('shared_leaders')
+            try:
+                result = func()
+                self.shared.set(self.result_key(key, token),
+                                json.dumps(result, ensure_ascii=False).encode('UTF-8'),
+                                self.shared_result_ttl)
+                return result
+            finally:
+                self.shared.delete(lock_key)
+        leader_token = self.shared.get(lock_key)
+        if leader_token is None:
+            # lock 확인 사이에 조회가 끝난 경우 직접 조회
+            self.count_shared('shared_timeouts')
+            return func()
+        result_key = self.result_key(key, leader_token.decode('UTF-8'))
+        deadline = time.monotonic() + self.shared_wait
+        while time.monotonic() < deadline:
+            time.sleep(self.shared_poll)
+            value = self.shared.get(result_key)
+            if value is None and self.shared.get(lock_key) != leader_token:
+                # 결과 저장 후 lock 이 삭제되었거나, 조회한 worker 가 결과를 저장하지 못한 경우(오류, 크기 초과)
+                value = self.shared.get(result_key)
+                if value is None:
+                    break
+            if value is not None:
+                self.count_shared('shared_coalesced')
+                # 기다린 요청이 결과를 읽었으므로 삭제(유지시간이 지나도 자동 삭제)
+                self.shared.delete(result_key)
+                return json.loads(value)
+        self.count_shared('shared_timeouts')
+        return func()
+
+    @staticmethod
+    def result_key(key, token):
+        """
+        조회 1건의 결과 저장 key
+        :param key: 조회 조건 key
+        :param token: lock 에 저장한 조회 token
+        :return: key
+        """
+        return "sf:result:%s:%s" % (key, token)
+
+    def count_shared(self, name):
+        """
+        worker 간 공유 통계 증가
+        :param name: 통계 항목
+        :return:
+        """
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        """
+        요청 병합 통계
+        :return: 직접 조회 수(leaders), 병합된 요청 수(coalesced) 등
+        """
+        with self.lock:
+            return {
+                "in_flight": len(self.calls),
+                "shared": self.shared is not None,
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "shared_leaders": self.shared_leaders,
+                "shared_coalesced": self.shared_coalesced,
+                "shared_timeouts": self.shared_timeouts
+            }
+
+
+class AsyncSingleFlight:
+    """
+    비동기(ASGI) 모드용 요청 병합 : 같은 event loop 안에서 진행중인 조회 결과를 공유
+    """
+    def __init__(self):
+        """
+        내부사용 변수 설정
+        """
+        self.calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key, func):
+        """
+        key 가 같은 조회가 진행중이면 결과를 기다리고, 없으면 func 를 호출
+        :param key: 조회 조건 key(Index + Query DSL)
+        :param func: 조회 coroutine 함수
+        :return: 조회 결과
+        """
+        future = self.calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            # 조회하던 요청이 취소된 경우 다시 조회(대기중인 요청 중 1건이 조회)
+            return await self.do(key, func)
+        future = asyncio.get_event_loop().create_future()
+        self.calls[key] = future
+        self.leaders += 1
+        try:
+            result = await func()
+            future.set_result(result)
+            return result
+        except Exception as err:
+            future.set_exception(err)
+            # 대기중인 요청이 없는 경우 경고가 출력되지 않도록 조회
+            future.exception()
+            raise
+        finally:
+            # 취소(CancelledError) 등으로 결과 없이 끝나면 대기중인 요청이 멈추지 않도록 future 를 취소
+            if not future.done():
+                future.cancel()
+            if self.calls.get(key) is future:
+                del self.calls[key]
+
+    def stats(self):
+        """
+        요청 병합 통계
+        :return: 직접 조회 수(leaders), 병합된 요청 수(coalesced)
+        """
+        return {
+            "in_flight": len(self.calls),
+            "shared": False,
+            "leaders": self.leaders,
+            "coalesced": self.coalesced
+        }
@@ -0,0 +1,187 @@
+import json
+import logging
+import logging.handlers
+import random
+import threading
+import time
+
+
+class SlowQueryLog:
+    """
+    처리시간이 기준을 넘은 Elasticsearch 조회를 파일로 기록
+    기준 이하 요청은 처리시간 비교만 하므로 평상시 부하는 거의 없고,
+    느린 요청이 몰리는 경우에는 sample_rate 비율만 기록하여 로그 기록 부하를 제한
+    """
+    def __init__(self, filename, threshold=1.0, sample_rate=1.0, max_bytes=10 * 1024 * 1024, backup_count=10):
+        """
+        내부사용 변수 설정
+        :param filename: 로그 파일 경로
+        :param threshold: 기록 기준 처리시간(초), 0 이하이면 기록하지 않음
+        :param sample_rate: 기준을 넘은 요청 중 기록할 비율(0 ~ 1)
+        :param max_bytes: 로그 파일 최대 크기
+        :param backup_count: 보관할 로그 파일 수
+        """
+        self.filename = filename
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.logger = None
+        self.lock = threading.Lock()
+        # 통계
+        self.logged = 0
+        self.sampled_out = 0
+
+    def get_logger(self):
+        """
+        로그 파일 핸들러 생성(처음 기록할 때 1번만 생성)
+        로그 파일을 열 수 없으면 elasticsearch.trace 로그로 출력
+        :return: logger
+        """
+        if self.logger is not None:
+            return self.logger
+        with self.lock:
+            if self.logger is None:
+                logger = logging.getLogger('search_restapi.slow_query')
+                logger.propagate = False
+                logger.setLevel(logging.INFO)
+                try:
+                    handler = logging.handlers.RotatingFileHandler(
+                        self.filename,
+                        maxBytes=self.max_bytes,
+                        backupCount=self.backup_count,
+                        encoding='UTF-8'
+                    )
+                except OSError as err:
+                    logger = logging.getLogger('elasticsearch.trace')
+                    logger.warning("slow query log file open failed : %s", err)
+                else:
+                    handler.setFormatter(logging.Formatter('%(message)s'))
+                    logger.addHandler(handler)
+                self.logger = logger
+        return self.logger
+
+    def is_slow(self, elapsed):
+        """
+        기록 대상 확인
+        :param elapsed: 처리시간(초)
+        :return: True : 기록 대상
+        """
+        if self.threshold <= 0 or elapsed < self.threshold:
+            return False
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return False
+        return True
+
+    def write(self, route, index, body, response, elapsed, rendered=None):
+        """
+        느린 조회 기록(1줄에 JSON 1건)
+        :param route: 요청 route
+        :param index: 조회 Index
+        :param body: Elasticsearch 로 전달한 Query DSL(SQL 은 SQL API 요청 body, search template 은 id, params)
+        :param response: Elasticsearch 응답
+        :param elapsed: 처리시간(초)
+        :param rendered: search template 을 변환한 Query DSL(다시 실행할 수 있는 조건), 없으면 기록하지 않음
+        :return:
+        """
+        total_hits, num_result = count_hits(response)
+        entry = {
+            "time": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "route": route,
+            "index": index,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "took": response.get('took') if isinstance(response, dict) else None,
+            "total_hits": total_hits,
+            "num_result": num_result,
+            "body": body
+        }
+        if rendered is not None:
+            entry['rendered'] = rendered
+        self.get_logger().info(json.dumps(entry, ensure_ascii=False, default=str))
+        self.logged += 1
+
+    def stats(self):
+        """
+        기록 현황
+        :return: 설정 및 누적 건수
+        """
+        return {
+            "threshold": self.threshold,
+            "sample_rate": self.sample_rate,
+            "logged": self.logged,
+            "sampled_out": self.sampled_out
+        }
+
+
+# 응답의 전체 건수, 결과 건수(검색, 일괄 검색, SQL 응답)
+def count_hits(response):
+    if not isinstance(response, dict):
+        return None, None
+    if 'responses' in response:
+        responses = [res for res in response['responses'] if 'hits' in res]
+        return (
+            sum(res['hits'].get('total', 0) for res in responses if isinstance(res['hits'].get('total'), int)),
+            sum(len(res['hits'].get('hits', [])) for res in responses)
+        )
+    if 'rows' in response:
+        return None, len(response['rows'])
+    hits = response.get('hits', {})
+    return hits.get('total'), len(hits.get('hits', []))
+
+
+# 나노초 -> 밀리초
+def nanos_to_ms(nanos):
+    return round((nanos or 0) / 1000000.0, 3)
+
+
+# Profile API 의 query 항목을 처리시간 순서의 목록으로 변환
+def flatten_profile_queries(queries, depth=0):
+    result = []
+    for query in queries or []:
+        breakdown = query.get('breakdown', {})
+        # 건수(_count) 항목을 제외하고 처리시간이 큰 단계 3개
+        top_breakdown = sorted(
+            ((name, value) for name, value in breakdown.items() if not name.endswith('_count')),
+            key=lambda item: item[1],
+            reverse=True
+        )[:3]
+        result.append({
+            "type": query.get('type'),
+            "description": (query.get('description') or '')[:200],
+            "depth": depth,
+            "time_ms": nanos_to_ms(query.get('time_in_nanos')),
+            "breakdown_ms": {name: nanos_to_ms(value) for name, value in top_breakdown}
+        })
+        result.extend(flatten_profile_queries(query.get('children'), depth + 1))
+    return result
+
+
+# Profile API 결과 요약 : shard 별 query, rewrite, collector, aggregation 처리시간과 처리시간이 큰 query 5개
+def condense_profile(profile, max_queries=5):
+    shards = []
+    for shard in (profile or {}).get('shards', []):
+        query_ns = 0
+        rewrite_ns = 0
+        collector_ns = 0
+        queries = []
+        for search_profile in shard.get('searches', []):
+            query_ns += sum(query.get('time_in_nanos', 0) for query in search_profile.get('query', []))
+            rewrite_ns += search_profile.get('rewrite_time', 0)
+            collector_ns += sum(collector.get('time_in_nanos', 0) for collector in search_profile.get('collector', []))
+            queries.extend(flatten_profile_queries(search_profile.get('query')))
+        aggregation_ns = sum(aggregation.get('time_in_nanos', 0) for aggregation in shard.get('aggregations', []))
+        shards.append({
+            "id": shard.get('id'),
+            "total_ms": nanos_to_ms(query_ns + rewrite_ns + collector_ns + aggregation_ns),
+            "query_ms": nanos_to_ms(query_ns),
+            "rewrite_ms": nanos_to_ms(rewrite_ns),
+            "collector_ms": nanos_to_ms(collector_ns),
+            "aggregation_ms": nanos_to_ms(aggregation_ns),
+            "slowest_queries": sorted(queries, key=lambda item: item['time_ms'], reverse=True)[:max_queries]
+        })
+    shards.sort(key=lambda item: item['total_ms'], reverse=True)
+    return {
+        "num_shards": len(shards),
+        "shards": shards
+    }
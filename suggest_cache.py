@@ -0,0 +1,177 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger('elasticsearch.trace')
+
+
+# 자동완성 prefix 정규화 : 앞뒤 공백 제거, 연속 공백은 1개로, 소문자 변환
+def normalize_prefix(prefix):
+    return " ".join((prefix or "").split()).lower()
+
+
+class SuggestCache:
+    """
+    자동완성 결과 캐시(프로세스 내)
+    prefix 별 조회 빈도를 집계하여 자주 조회되는 prefix(hot prefix)의 상위 N개 결과를 유지하고,
+    background thread 가 주기적으로 hot prefix 의 결과를 다시 조회하여 요청 처리 중에는 Elasticsearch 를 호출하지 않음
+    저장 건수와 빈도 집계 건수는 최대값을 넘으면 빈도가 낮은 순서로 삭제하여 메모리 사용량을 제한
+    uWSGI 처럼 fork 하는 경우 pid 가 바뀌면 refresh thread 를 다시 시작
+    """
+    def __init__(self, max_prefixes=5000, hot_prefixes=500, size=10, ttl=600, refresh_interval=60, decay=0.5):
+        """
+        내부사용 변수 설정
+        :param max_prefixes: 최대 저장 prefix 수
+        :param hot_prefixes: 주기적으로 다시 조회할 prefix 수(조회 빈도 상위)
+        :param size: prefix 별 저장할 자동완성 결과 수
+        :param ttl: 저장된 결과 유효시간(초), refresh 되지 않은 결과는 유효시간이 지나면 다시 조회
+        :param refresh_interval: hot prefix 다시 조회 주기(초)
+        :param decay: refresh 주기마다 조회 빈도에 곱하는 값(최근 조회 빈도 우선)
+        """
+        self.max_prefixes = max_prefixes
+        self.hot_prefixes = hot_prefixes
+        self.size = size
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.decay = decay
+        # prefix -> (자동완성 결과 목록, 저장시간(monotonic))
+        self.entries = {}
+        # prefix -> 조회 빈도
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.pid = None
+        self.stop_event = threading.Event()
+        # 통계
+        self.hits = 0
+        self.misses = 0
+        self.refreshed = 0
+        self.refresh_errors = 0
+        self.evictions = 0
+
+    def get(self, prefix):
+        """
+        저장된 자동완성 결과 조회(조회 빈도 증가)
+        :param prefix: normalize_prefix 로 정규화한 prefix
+        :return: 자동완성 결과 목록, 없거나 유효시간이 지난 경우 None
+        """
+        now = time.monotonic()
+        with self.lock:
+            self.counts[prefix] = self.counts.get(prefix, 0) + 1
+            entry = self.entries.get(prefix)
+            if entry is not None and now - entry[1] < self.ttl:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, prefix, suggestions):
+        """
+        자동완성 결과 저장, 최대 저장 수를 넘으면 조회 빈도가 낮은 prefix 삭제
+        :param prefix: normalize_prefix 로 정규화한 prefix
+        :param suggestions: 자동완성 결과 목록
+        :return:
+        """
+        with self.lock:
+            self.entries[prefix] = (suggestions[:self.size], time.monotonic())
+            if len(self.entries) > self.max_prefixes:
+                # 1건씩 삭제하면 저장할 때마다 정렬하게 되므로 10% 를 한 번에 삭제
+                remove_count = len(self.entries) - int(self.max_prefixes * 0.9)
+                targets = sorted(self.entries, key=lambda item: self.counts.get(item, 0))[:remove_count]
+                for target in targets:
+                    del self.entries[target]
+                self.evictions += len(targets)
+            if len(self.counts) > self.max_prefixes * 2:
+                # 저장되지 않은 prefix 의 조회 빈도부터 삭제
+                targets = sorted(self.counts, key=lambda item: (item in self.entries, self.counts[item]))
+                for target in targets[:len(self.counts) - self.max_prefixes]:
+                    del self.counts[target]
+
+    def start(self, fetch):
+        """
+        현재 프로세스의 refresh thread 시작(프로세스 별 1번)
+        :param fetch: prefix 를 받아 자동완성 결과 목록을 조회하는 함수
+        :return:
+        """
+        pid = os.getpid()
+        if self.pid == pid:
+            return
+        with self.lock:
+            if self.pid == pid:
+                return
+            # fork 전 부모 프로세스의 결과는 그대로 사용하고 thread 만 다시 시작
+            self.stop_event = threading.Event()
+            thread = threading.Thread(
+                target=self.refresh_loop,
+                args=(fetch, self.stop_event),
+                name='suggest-refresh',
+                daemon=True
+            )
+            thread.start()
+            self.pid = pid
+
+    def refresh_loop(self, fetch, stop_event):
+        """
+        refresh 주기마다 hot prefix 다시 조회
+        :param fetch: 자동완성 결과 조회 함수
+        :param stop_event: 종료 event
+        :return:
+        """
+        while not stop_event.wait(self.refresh_interval):
+            for prefix in self.select_hot_prefixes():
+                if stop_event.is_set():
+                    return
+                try:
+                    self.put(prefix, fetch(prefix))
+                    self.refreshed += 1
+                except Exception as err:
+                    # 조회 실패 시 기존 결과를 유효시간까지 사용
+                    self.refresh_errors += 1
+                    logger.warning("suggest refresh failed : %s : %s", prefix, err)
+
+    def select_hot_prefixes(self):
+        """
+        다시 조회할 prefix 선택 후 조회 빈도 감소
+        이번 주기에 조회되지 않은 prefix 는 다시 조회하지 않고 유효시간이 지나면 삭제
+        :return: 조회 빈도 상위 prefix 목록
+        """
+        now = time.monotonic()
+        with self.lock:
+            hot = sorted(
+                (prefix for prefix in self.entries if self.counts.get(prefix, 0) >= 1),
+                key=lambda item: self.counts[item],
+                reverse=True
+            )[:self.hot_prefixes]
+            expired = [prefix for prefix, entry in self.entries.items() if now - entry[1] >= self.ttl]
+            for prefix in expired:
+                del self.entries[prefix]
+            self.counts = {
+                prefix: count * self.decay for prefix, count in self.counts.items() if count * self.decay >= 0.1
+            }
+        return hot
+
+    def stop(self):
+        """
+        refresh thread 종료(프로그램 종료 시)
+        :return:
+        """
+        self.stop_event.set()
+
+    def stats(self):
+        """
+        캐시 통계
+        :return: 저장 prefix 수, hit/miss, refresh 건수
+        """
+        with self.lock:
+            return {
+                "pid": self.pid,
+                "prefixes": len(self.entries),
+                "tracked_prefixes": len(self.counts),
+                "max_prefixes": self.max_prefixes,
+                "hot_prefixes": self.hot_prefixes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshed": self.refreshed,
+                "refresh_errors": self.refresh_errors,
+                "evictions": self.evictions
+            }
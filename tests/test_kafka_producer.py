@@ -0,0 +1,59 @@
+# Kafka Producer 생성과 전송 오류 응답(429 : 전송 대기 크기 초과, 503 : metadata 조회 실패) 확인
+# 접속되지 않는 broker 주소를 사용하므로 Kafka 없이 실행 가능
+# 실행 명령어 :
+# python -m pytest tests
+import logging
+import os
+import socket
+import sys
+import unittest
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_dir)
+
+import app as search_app  # noqa: E402
+from kafka import KafkaProducer  # noqa: E402
+
+
+# 사용하지 않는 port(접속 거부)
+def get_closed_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class KafkaProducerTest(unittest.TestCase):
+    def setUp(self):
+        # 로그 파일 경로(/var/log/kafka_api) 대신 기본 logger 사용
+        search_app.logger = logging.getLogger('kafka_api_test')
+        self.saved = (search_app.kafka_bootstrap_servers, search_app.kafka_max_pending_bytes,
+                      search_app.kafka_metadata_timeout)
+        search_app.kafka_bootstrap_servers = ['127.0.0.1:%d' % get_closed_port()]
+        search_app.kafka_metadata_timeout = 0.3
+        self.client = search_app.app.test_client()
+
+    def tearDown(self):
+        search_app.close_kafka_conn()
+        (search_app.kafka_bootstrap_servers, search_app.kafka_max_pending_bytes,
+         search_app.kafka_metadata_timeout) = self.saved
+
+    def test_producer_created_with_supported_options(self):
+        options = search_app.make_kafka_producer_options()
+        self.assertTrue(set(options) <= set(KafkaProducer.DEFAULT_CONFIG))
+        self.assertIsInstance(search_app.get_kafka_conn(), KafkaProducer)
+
+    def test_pending_bytes_over_limit_returns_429(self):
+        search_app.get_kafka_conn()
+        search_app._kafka_ready_topics.add('bench')
+        search_app.kafka_max_pending_bytes = 0
+        res = self.client.post('/kafka_api/bench', json=[{"value": 1}, {"value": 2}])
+        self.assertEqual(res.status_code, 429)
+        self.assertEqual(res.get_json()['not_sent'], 2)
+
+    def test_metadata_timeout_returns_503(self):
+        res = self.client.post('/kafka_api/bench', json=[{"value": 1}])
+        self.assertEqual(res.status_code, 503)
+
+
+if __name__ == '__main__':
+    unittest.main()
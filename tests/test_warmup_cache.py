@@ -0,0 +1,44 @@
+# worker warm-up 으로 미리 조회한 검색이 실제 요청에서 캐시 hit 가 되는지 확인
+# 대체 Elasticsearch(benchmarks/fake_elasticsearch.py)를 같은 프로세스에서 실행하여 사용
+# 실행 명령어 :
+# python -m pytest tests
+import os
+import sys
+import unittest
+from urllib.parse import quote
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_dir)
+sys.path.insert(0, os.path.join(repo_dir, 'benchmarks'))
+
+import app as search_app  # noqa: E402
+from fake_elasticsearch import start_fake_elasticsearch  # noqa: E402
+
+
+class WarmUpCacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fake_server, cls.fake_state = start_fake_elasticsearch(latency_ms=0)
+        es_url = 'http://127.0.0.1:%d' % cls.fake_server.server_address[1]
+        search_app.elasticsearch_server[:] = [es_url] * len(search_app.elasticsearch_server)
+        search_app.elasticsearch_sniff_on_connection_fail = False
+        search_app.warm_up_worker()
+        cls.client = search_app.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fake_server.shutdown()
+
+    def test_warmed_query_is_cache_hit(self):
+        for item in search_app.warmup_queries:
+            path = '/%s/1/%s' % (item['type'], quote(item['keyword']))
+            hits = search_app.search_cache.stats()['hits']
+            es_requests = self.fake_state.requests
+            res = self.client.get(path, query_string=item.get('args', {}))
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(search_app.search_cache.stats()['hits'], hits + 1, path)
+            self.assertEqual(self.fake_state.requests, es_requests, path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+
+
+class CaptureQueueHandler(logging.handlers.QueueHandler):
+    """
+    요청 기록을 변환하지 않고 대기열에 전달(JSON 변환, 파일 기록은 listener thread 에서 처리)
+    대기열이 가득 찬 경우 요청 처리가 지연되지 않도록 기록을 버림
+    """
+    def __init__(self, record_queue):
+        """
+        내부사용 변수 설정
+        :param record_queue: 요청 기록 대기열
+        """
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonLineFormatter(logging.Formatter):
+    """
+    요청 기록(dict)을 JSON 1줄로 변환
+    """
+    def format(self, record):
+        return json.dumps(record.msg, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+class TrafficCapture:
+    """
+    운영 요청 기록(replay 도구 입력)
+    sample_rate 비율의 요청만 route, 경로 파라메터, 요청 파라메터, 처리시간, 응답 크기를 JSONL 파일로 기록
+    요청 처리 thread 에서는 dict 생성 후 대기열에 넣기만 하고 JSON 변환, 파일 기록은 worker 별 listener thread 에서 처리
+    uWSGI worker 간 파일 rotate 가 겹치지 않도록 worker 별로 파일을 나눠서 기록(traffic.jsonl -> traffic.1.jsonl)
+    """
+    def __init__(self, filename, sample_rate=0.0, max_bytes=50 * 1024 * 1024, backup_count=10, queue_size=10000,
+                 max_body_bytes=4096, exclude_prefixes=(), exclude_body_routes=()):
+        """
+        내부사용 변수 설정
+        :param filename: 기록 파일 경로
+        :param sample_rate: 기록할 요청 비율(0 ~ 1), 0 이면 기록하지 않음
+        :param max_bytes: 기록 파일 최대 크기
+        :param backup_count: 보관할 기록 파일 수
+        :param queue_size: 기록 대기열 크기(초과 시 기록을 버림)
+        :param max_body_bytes: 기록할 요청 body 최대 크기(초과 시 body 는 기록하지 않음)
+        :param exclude_prefixes: 기록하지 않을 경로(/metrics, /stats 등)
+        :param exclude_body_routes: body 를 기록하지 않을 route(요청 body 를 stream 으로 읽는 route)
+        """
+        self.filename = filename
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue_size = queue_size
+        self.max_body_bytes = max_body_bytes
+        self.exclude_prefixes = tuple(exclude_prefixes)
+        self.exclude_body_routes = frozenset(exclude_body_routes)
+        self.lock = threading.Lock()
+        self.pid = None
+        self.handler = None
+        self.listener = None
+        # 통계
+        self.captured = 0
+        self.skipped_body = 0
+
+    def is_sampled(self, path):
+        """
+        기록 대상 확인
+        :param path: 요청 경로
+        :return: True : 기록 대상
+        """
+        if self.sample_rate <= 0 or path.startswith(self.exclude_prefixes):
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def is_body_captured(self, route, body_size):
+        """
+        요청 body 기록 대상 확인(요청 body 를 읽기 전에 확인)
+        :param route: 요청 route
+        :param body_size: 요청 body 크기(Content-Length)
+        :return: True : body 기록 대상
+        """
+        if not body_size or route in self.exclude_body_routes:
+            return False
+        if body_size > self.max_body_bytes:
+            self.skipped_body += 1
+            return False
+        return True
+
+    def make_worker_filename(self, worker_id):
+        """
+        worker 별 기록 파일 경로
+        :param worker_id: uWSGI worker id, 없으면 pid
+        :return: 파일 경로
+        """
+        base, ext = os.path.splitext(self.filename)
+        return "%s.%s%s" % (base, worker_id, ext)
+
+    def get_handler(self, worker_id):
+        """
+        현재 프로세스의 대기열, listener thread 생성(프로세스 별 1번)
+        파일을 열 수 없으면 elasticsearch.trace 로그에 경고 후 기록하지 않음
+        :param worker_id: uWSGI worker id, 없으면 pid
+        :return: CaptureQueueHandler, 기록할 수 없으면 None
+        """
+        pid = os.getpid()
+        if self.pid == pid:
+            return self.handler
+        with self.lock:
+            if self.pid == pid:
+                return self.handler
+            self.handler = None
+            try:
+                file_handler = logging.handlers.RotatingFileHandler(
+                    self.make_worker_filename(worker_id),
+                    maxBytes=self.max_bytes,
+                    backupCount=self.backup_count,
+                    encoding='UTF-8'
+                )
+            except OSError as err:
+                logging.getLogger('elasticsearch.trace').warning("traffic capture file open failed : %s", err)
+            else:
+                file_handler.setFormatter(JsonLineFormatter())
+                record_queue = queue.Queue(maxsize=self.queue_size)
+                self.listener = logging.handlers.QueueListener(record_queue, file_handler)
+                self.listener.start()
+                self.handler = CaptureQueueHandler(record_queue)
+            self.pid = pid
+        return self.handler
+
+    def capture(self, worker_id, entry, body=None, body_skipped=False):
+        """
+        요청 기록
+        :param worker_id: uWSGI worker id, 없으면 pid
+        :param entry: 기록 항목(route, path, args, status, elapsed_ms, response_bytes 등)
+        :param body: 요청 body({"form": {...}} 또는 {"json": ...}), is_body_captured 로 확인한 경우만 전달
+        :param body_skipped: True : 크기 초과로 body 를 기록하지 않음
+        :return:
+        """
+        handler = self.get_handler(worker_id)
+        if handler is None:
+            return
+        if body:
+            entry.update(body)
+        elif body_skipped:
+            entry['body_skipped'] = True
+        entry['ts'] = round(time.time(), 4)
+        handler.emit(logging.makeLogRecord({"msg": entry}))
+        self.captured += 1
+
+    def stop(self):
+        """
+        대기중인 기록을 파일에 기록 후 listener thread 종료(프로그램 종료 시)
+        :return:
+        """
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+            self.handler = None
+            self.pid = None
+
+    def stats(self):
+        """
+        기록 현황
+        :return: 설정 및 누적 건수
+        """
+        return {
+            "sample_rate": self.sample_rate,
+            "captured": self.captured,
+            "dropped": self.handler.dropped if self.handler is not None else 0,
+            "skipped_body": self.skipped_body
+        }
@@ -0,0 +1,114 @@
+from contextlib import contextmanager
+import builtins
+import os
+import sys
+import time
+
+# import 시간을 기록할 주요 모듈
+default_import_modules = ('flask', 'flask_restful', 'elasticsearch', 'kafka', 'pycurl', 'requests')
+
+
+class StartupTimer:
+    """
+    worker 시작 단계별 처리시간 기록
+    import 시간은 uWSGI master 에서 app 을 import 할 때 1번 측정하고(fork 후 worker 에 그대로 전달),
+    warm-up 단계는 worker 별로 측정하여 1줄로 로그 출력
+    """
+    def __init__(self, modules=default_import_modules):
+        """
+        내부사용 변수 설정
+        :param modules: import 시간을 기록할 모듈(최상위 package 이름)
+        """
+        self.modules = modules
+        # 모듈 -> import 시간(초), 하위 모듈 import 시간 포함
+        self.imports = {}
+        # (단계, 처리시간(초), 오류)
+        self.stages = []
+        self.pid = None
+        self.started = None
+
+    @contextmanager
+    def measure_imports(self, name='app'):
+        """
+        with 구문 안에서 처음 import 되는 주요 모듈의 import 시간 기록
+        :param name: 전체 import 시간을 기록할 이름
+        :return:
+        """
+        original_import = builtins.__import__
+        timing = set()
+
+        def timed_import(module_name, globals=None, locals=None, fromlist=(), level=0):
+            root = module_name.split('.')[0]
+            if level or root not in self.modules or root in timing or root in sys.modules:
+                return original_import(module_name, globals, locals, fromlist, level)
+            timing.add(root)
+            started = time.perf_counter()
+            try:
+                return original_import(module_name, globals, locals, fromlist, level)
+            finally:
+                self.imports[root] = time.perf_counter() - started
+                timing.discard(root)
+
+        started = time.perf_counter()
+        builtins.__import__ = timed_import
+        try:
+            yield
+        finally:
+            builtins.__import__ = original_import
+            self.imports[name] = time.perf_counter() - started
+
+    def begin(self):
+        """
+        worker 시작(fork 후) : 이전 프로세스의 단계 기록 초기화
+        :return:
+        """
+        self.pid = os.getpid()
+        self.stages = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, logger=None):
+        """
+        with 구문으로 단계 처리시간 기록, 오류가 발생해도 다음 단계를 계속 진행(warm-up 실패로 worker 가 종료되지 않도록 함)
+        :param name: 단계 이름
+        :param logger: 오류 로그를 출력할 logger
+        :return:
+        """
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as err:
+            error = str(err)
+            if logger is not None:
+                logger.warning("worker warm-up %s failed : %s", name, err)
+        self.stages.append((name, time.perf_counter() - started, error))
+
+    def summary(self):
+        """
+        시작 단계별 처리시간
+        :return: import, warm-up 단계별 처리시간(ms)
+        """
+        return {
+            "pid": self.pid,
+            "imports_ms": {name: round(seconds * 1000, 1) for name, seconds in self.imports.items()},
+            "stages_ms": {name: round(seconds * 1000, 1) for name, seconds, _ in self.stages},
+            "errors": {name: error for name, _, error in self.stages if error is not None},
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1) if self.started is not None else None
+        }
+
+    def log(self, logger):
+        """
+        시작 단계별 처리시간 로그 출력(1줄)
+        :param logger: logger
+        :return:
+        """
+        summary = self.summary()
+        parts = ["import_%s=%.1fms" % item for item in summary['imports_ms'].items()]
+        parts += ["%s=%.1fms%s" % (name, seconds * 1000, " (failed)" if error else "")
+                  for name, seconds, error in self.stages]
+        logger.info("worker warm-up pid=%s total=%sms %s", summary['pid'], summary['total_ms'], " ".join(parts))
+
+
+# uWSGI master 에서 측정한 import 시간을 worker 에서도 사용하도록 모듈 단위로 1개 생성
+startup_timer = StartupTimer()
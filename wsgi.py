@@ -1,5 +1,9 @@
 # wsgi.py # app.py와 같은 위치
-from app import app
+from warmup import startup_timer
+
+# app import 시간 측정(flask_restful, elasticsearch, kafka, pycurl 등 주요 모듈 import 시간 포함)
+with startup_timer.measure_imports():
+    from app import app
 
 if __name__ == '__main__':
-    app.run()
\ No newline at end of file
+    app.run()